@@ -1,7 +1,15 @@
-from django.contrib import admin
+import time
+from datetime import datetime
+
+import redis
+from django.contrib import admin, messages
 from django.db import models
 from django.db.models import Count
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
 
+from . import search_indexing
 from .forms import SubscribeChannelForm
 # --- YANGI MODELLARNI IMPORT QILISH ---
 from .models import (Bot, User, Broadcast, BroadcastRecipient,
@@ -89,6 +97,42 @@ class TgFileAdmin(admin.ModelAdmin):
     list_filter = ('subcategory', 'file_type', 'require_subscription', 'uploaded_at') # 'subcategory' filtrga qo'shildi
     search_fields = ('title', 'description')
     list_select_related = ('subcategory', 'subcategory__category', 'uploaded_by') # DB so'rovlarini optimallashtirish
+    change_list_template = 'admin/kuku_ai_bot/tgfile/change_list.html'
+    actions = ['reindex_selected']
+
+    def get_urls(self):
+        urls = [
+            path('search-index/', self.admin_site.admin_view(self.search_index_view),
+                 name='kuku_ai_bot_tgfile_search_index'),
+        ]
+        return urls + super().get_urls()
+
+    def search_index_view(self, request):
+        """Qidiruv indeksi navbati: kutayotgan fayllar soni, eng eskisining yoshi va watermark."""
+        try:
+            status = search_indexing.index_status()
+        except redis.RedisError as e:
+            status = None
+            self.message_user(request, f"Redis xatosi: {e}", level=messages.ERROR)
+        if status:
+            now = time.time()
+            for key in ('oldest_pending', 'watermark', 'last_run'):
+                value = status[key]
+                status[f'{key}_at'] = datetime.fromtimestamp(value, tz=timezone.get_current_timezone()) if value else None
+            status['lag_seconds'] = int(now - status['oldest_pending']) if status['oldest_pending'] else 0
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': "Qidiruv indeksi navbati",
+            'status': status,
+        }
+        return TemplateResponse(request, 'admin/kuku_ai_bot/tgfile/search_index.html', context)
+
+    @admin.action(description="Tanlangan fayllarni qayta indekslash")
+    def reindex_selected(self, request, queryset):
+        file_ids = list(queryset.values_list('pk', flat=True))
+        search_indexing.enqueue(file_ids)
+        self.message_user(request, f"{len(file_ids)} ta fayl indekslash navbatiga qo'yildi.")
 # --- -------------------------------------------- ---
 
 
@@ -170,8 +214,8 @@ class BroadcastAdmin(admin.ModelAdmin):
 
 @admin.register(SearchQuery)
 class SearchQueryAdmin(admin.ModelAdmin):
-    list_display = ('query_text', 'user', 'is_deep_search', 'found_results', 'created_at')
-    list_filter = ('is_deep_search', 'found_results', 'created_at')
+    list_display = ('query_text', 'user', 'is_deep_search', 'found_results', 'tier', 'created_at')
+    list_filter = ('is_deep_search', 'found_results', 'tier', 'created_at')
     search_fields = ('query_text', 'user__username')
 
     def has_add_permission(self, request):
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class KukuAiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.kuku_ai_bot'
+
+    def ready(self):
+        from . import signals  # noqa: F401
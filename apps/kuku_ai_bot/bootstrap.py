@@ -0,0 +1,71 @@
+# bootstrap.py
+
+import asyncio
+import logging
+
+from django.conf import settings
+from telegram.error import TelegramError
+from telegram.ext import Application
+
+from . import registry
+from .handler import get_application, telegram_applications
+from .models import Bot
+from .search import close_async_client
+from .update_queue import update_queue
+
+logger = logging.getLogger(__name__)
+
+_init_lock = asyncio.Lock()
+# initialize() qilingan Application'lar tokenlari
+_ready_tokens: set[str] = set()
+
+
+async def ensure_application(bot_instance: Bot) -> Application:
+    """
+    Bot uchun tayyor (initialize qilingan) Application'ni qaytaradi.
+
+    Odatda barcha Application'lar startup() vaqtida tayyorlanadi, shuning uchun
+    bu yerda faqat identity tekshiruvi bo'ladi. Worker ishga tushgandan keyin
+    qo'shilgan botlar birinchi update'da bir marta initialize qilinadi.
+    """
+    application = get_application(bot_instance.token)
+    if bot_instance.token not in _ready_tokens:
+        async with _init_lock:
+            if bot_instance.token not in _ready_tokens:
+                # Application.initialize() Bot.initialize() orqali get_me() ni ham chaqiradi
+                await application.initialize()
+                _ready_tokens.add(bot_instance.token)
+    if application.bot_data.get("bot_instance") is not bot_instance:
+        application.bot_data["bot_instance"] = bot_instance
+    return application
+
+
+async def startup() -> None:
+    """
+    ASGI lifespan startup: registrni yuklaydi, har bir botning handler grafini
+    quradi, initialize qiladi (get_me bilan "isitadi").
+    """
+    await registry.aload()
+    registry.start_listener()
+    for bot_instance in registry.all_bots():
+        try:
+            await ensure_application(bot_instance)
+        except TelegramError as e:
+            # Bitta yaroqsiz token butun worker'ni to'xtatib qo'ymasligi kerak
+            logger.error(f"Failed to initialize bot {bot_instance}: {e}")
+    logger.info(f"Bot applications ready: {len(registry.all_bots())}")
+    if settings.BOT_UPDATE_MODE == "queue":
+        update_queue.start()
+
+
+async def shutdown() -> None:
+    """ASGI lifespan shutdown: navbatni bo'shatadi va barcha Application'larni toza yopadi."""
+    await update_queue.stop()
+    for token in list(_ready_tokens):
+        try:
+            await telegram_applications[token].shutdown()
+        except TelegramError as e:
+            logger.error(f"Failed to shut down application for bot {token[:10]}...: {e}")
+        _ready_tokens.discard(token)
+    await registry.stop_listener()
+    await close_async_client()
@@ -0,0 +1,100 @@
+# dedup.py
+
+import logging
+from collections import OrderedDict
+
+import redis
+from django.conf import settings
+
+from .metrics import UPDATE_DUPLICATES
+from .redis_client import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+DEDUP_KEY = "kuku_ai_bot:seen_update:{bot_id}:{update_id}"
+
+# Update holatlari: birinchi urinish hali bajarilmoqda yoki muvaffaqiyatli qabul qilingan
+PROCESSING = "processing"
+DONE = "done"
+
+
+class UpdateDeduplicator:
+    """
+    Telegram qayta yuborgan (retry) update'larni `(bot_id, update_id)` bo'yicha tashlab yuboradi.
+
+    Birinchi qatlam — worker ichidagi LRU (Redis'ga borishsiz), ikkinchisi —
+    barcha worker'lar uchun umumiy Redis `SET NX EX`. Update avval qisqa muddatli
+    "processing" holatini oladi (`processing_ttl` — worker yiqilsa ham belgi
+    o'chadi), muvaffaqiyatdan keyingina "done" (`ttl`). Birinchi urinish hali
+    ishlayotganda kelgan retry'ga webhook non-2xx qaytaradi — birinchi urinish
+    muvaffaqiyatsiz bo'lsa, keyingi retry o'tadi. Redis ishlamay qolsa update
+    o'tkazib yuboriladi (fail-open), chunki dublikatdan ko'ra yo'qolgan update yomonroq.
+    """
+
+    def __init__(self, ttl: int, processing_ttl: int, lru_size: int):
+        self.ttl = ttl
+        self.processing_ttl = processing_ttl
+        self.lru_size = lru_size
+        self._seen: OrderedDict[tuple[int, int], str] = OrderedDict()
+
+    def _remember(self, key: tuple[int, int], state: str) -> None:
+        self._seen[key] = state
+        self._seen.move_to_end(key)
+        if len(self._seen) > self.lru_size:
+            self._seen.popitem(last=False)
+
+    async def begin(self, bot_id: int, update_id: int) -> str | None:
+        """
+        Update'ni "processing" deb belgilaydi. Yangi update uchun None, aks holda
+        mavjud holat: PROCESSING (birinchi urinish hali tugamagan) yoki DONE.
+        """
+        key = (bot_id, update_id)
+        state = self._seen.get(key)
+        if state is not None:
+            self._seen.move_to_end(key)
+            UPDATE_DUPLICATES.labels(layer="memory").inc()
+            return state
+        self._remember(key, PROCESSING)
+        redis_key = DEDUP_KEY.format(bot_id=bot_id, update_id=update_id)
+        client = get_async_redis()
+        try:
+            if await client.set(redis_key, PROCESSING, nx=True, ex=self.processing_ttl):
+                return None
+            state = await client.get(redis_key)
+        except redis.RedisError as e:
+            logger.warning(f"Update dedup Redis check failed, letting update through: {e}")
+            return None
+        if state is None:
+            # Belgi shu orada muddati o'tib o'chgan — update yangi deb hisoblanadi
+            return None
+        UPDATE_DUPLICATES.labels(layer="redis").inc()
+        state = state.decode() if isinstance(state, bytes) else state
+        if state == DONE:
+            self._remember(key, DONE)
+        else:
+            # Boshqa worker'dagi urinish: bu worker'da belgi saqlanmaydi (u forget qilmaydi)
+            self._seen.pop(key, None)
+        return state
+
+    async def finish(self, bot_id: int, update_id: int) -> None:
+        """Update qabul qilindi (qayta ishlandi yoki navbatga/stream'ga yozildi) — endi retry'lar tashlanadi."""
+        self._remember((bot_id, update_id), DONE)
+        try:
+            await get_async_redis().set(DEDUP_KEY.format(bot_id=bot_id, update_id=update_id), DONE, ex=self.ttl)
+        except redis.RedisError as e:
+            logger.warning(f"Update dedup Redis finish failed: {e}")
+
+    async def forget(self, bot_id: int, update_id: int) -> None:
+        """Update qabul qilinmagan bo'lsa (masalan, 503), Telegram retry'i o'tishi uchun belgini olib tashlaydi."""
+        self._seen.pop((bot_id, update_id), None)
+        try:
+            await get_async_redis().delete(DEDUP_KEY.format(bot_id=bot_id, update_id=update_id))
+        except redis.RedisError as e:
+            logger.warning(f"Update dedup Redis forget failed: {e}")
+
+
+update_deduplicator = UpdateDeduplicator(
+    ttl=settings.BOT_UPDATE_DEDUP_TTL,
+    processing_ttl=settings.BOT_UPDATE_DEDUP_PROCESSING_TTL,
+    lru_size=settings.BOT_UPDATE_DEDUP_LRU_SIZE,
+)
@@ -1,14 +1,104 @@
 # apps/tg_files/documents.py
 
+import logging
+
 from django_elasticsearch_dsl import Document, fields
 from django_elasticsearch_dsl.registries import registry
-from tika import parser
-from .models import TgFile
+from elasticsearch_dsl import analyzer, char_filter, token_filter
+from .extraction import extract_text, extraction_stats, extraction_summary, store_content_text
+from .models import Category, SubCategory, TgFile
+from .transliteration import mapping_rules
+
+logger = logging.getLogger(__name__)
+
+# --- Analyzerlar ---
+# Asosiy matn: standard tokenizer + lowercase + asciifolding (o‘zbek, ingliz va
+# lotin yozuvidagi boshqa tillar uchun umumiy). Rus va turk tillari uchun
+# alohida stemming subfield'lari qo'shiladi.
+text_analyzer = analyzer(
+    'kuku_text',
+    tokenizer='standard',
+    filter=['lowercase', 'asciifolding'],
+)
+
+# Kirill/lotin: o'zbek (va rus) kirill harflari va o‘/g‘ apostroflari bir xil lotin
+# ko'rinishga keltiriladi. Char filter indekslashda ham, qidiruvda ham shu analyzer
+# orqali ishlaydi — so'rovni bir nechta variantga ko'paytirish shart emas.
+translit_char_filter = char_filter('kuku_translit', type='mapping', mappings=mapping_rules())
+translit_analyzer = analyzer(
+    'kuku_translit',
+    tokenizer='standard',
+    char_filter=[translit_char_filter],
+    filter=['lowercase', 'asciifolding'],
+)
+
+# Prefix (search-as-you-type) qidiruvi uchun: indekslashda har bir so'zning
+# 2..20 belgili boshlanishlari saqlanadi, qidiruvda esa so'rov oddiy tokenlanadi.
+# Shu bilan `*text*` (leading wildcard) kabi term lug'atini to'liq aylanib chiqish kerak bo'lmaydi.
+edge_ngram_filter = token_filter('kuku_edge_ngram', type='edge_ngram', min_gram=2, max_gram=20)
+prefix_analyzer = analyzer(
+    'kuku_prefix',
+    tokenizer='standard',
+    char_filter=[translit_char_filter],
+    filter=['lowercase', 'asciifolding', edge_ngram_filter],
+)
+
+
+def short_text_field(attr=None):
+    """
+    Sarlavha va fayl nomi kabi qisqa maydonlar: to'liq so'z + transliteratsiya
+    (`.latn`) + prefix + keyword + inline rejim uchun search-as-you-type
+    (`.suggest`, `._2gram`, `._3gram`). Prefix va suggest ham yozuvdan qat'i nazar ishlaydi.
+    """
+    return fields.TextField(
+        attr=attr,
+        analyzer=text_analyzer,
+        fields={
+            'latn': fields.TextField(analyzer=translit_analyzer),
+            'prefix': fields.TextField(analyzer=prefix_analyzer, search_analyzer=translit_analyzer),
+            'raw': fields.KeywordField(),
+            'suggest': fields.SearchAsYouTypeField(analyzer=translit_analyzer),
+        },
+    )
+
+
+def long_text_field(attr=None, offsets=False):
+    """
+    Tavsif va hujjat matni: umumiy analyzer + transliteratsiya + rus/turk tillari uchun stemming subfield'lari.
+    `offsets=True` — postings'da belgi offset'lari saqlanadi: unified highlighter
+    parchani matnni qayta analiz qilmasdan topadi (katta PDF'larda ham arzon).
+    """
+    options = {'index_options': 'offsets'} if offsets else {}
+    return fields.TextField(
+        attr=attr,
+        analyzer=text_analyzer,
+        fields={
+            'latn': fields.TextField(analyzer=translit_analyzer, **options),
+            'ru': fields.TextField(analyzer='russian'),
+            'tr': fields.TextField(analyzer='turkish'),
+        },
+        **options,
+    )
 
 
 @registry.register_document
 class TgFileDocument(Document):
-    content = fields.TextField(attr='content')
+    title = short_text_field(attr='title')
+    file_name = short_text_field(attr='file_name')
+    description = long_text_field(attr='description')
+    content = long_text_field(attr='content', offsets=True)
+    file_type = fields.KeywordField(attr='file_type')
+    # Bot natijalar sahifasi shu maydonlar (_source) bilan chiziladi — bazaga so'rovsiz
+    size_in_bytes = fields.LongField(attr='size_in_bytes')
+    # Facet'lar (terms aggregation) va filtrlar uchun keyword/ID maydonlar
+    subcategory = fields.ObjectField(properties={
+        'id': fields.IntegerField(),
+        'name': fields.KeywordField(),
+    })
+    category = fields.ObjectField(attr='subcategory.category', properties={
+        'id': fields.IntegerField(),
+        'name': fields.KeywordField(),
+    })
 
     class Index:
         name = 'tg_files'
@@ -16,40 +106,27 @@ class TgFileDocument(Document):
 
     class Django:
         model = TgFile
-        fields = [
-            'title',
-            'description',
-            'file_name',
-            'file_type',
-        ]
+        fields = []
+        related_models = [SubCategory, Category]
+
+    def get_instances_from_related(self, related_instance):
+        # Subkategoriya/kategoriya o'zgarsa, unga tegishli fayllar qayta indekslanadi
+        if isinstance(related_instance, SubCategory):
+            return related_instance.tgfile_set.all()
+        if isinstance(related_instance, Category):
+            return TgFile.objects.filter(subcategory__category=related_instance)
+
+    def get_indexing_queryset(self):
+        # `search_index --populate/--rebuild`: hujjatlar tugagach matn keshi statistikasi chiqariladi
+        extraction_stats.clear()
+        yield from super().get_indexing_queryset()
+        logger.info(extraction_summary())
 
     def prepare_content(self, instance):
         """
-        Faqat matnli hujjatlar (pdf, doc, other) ichidagi matnni Tika yordamida ajratib oladi.
-        Rasm, video, arxiv kabi fayllarni e'tiborsiz qoldiradi.
+        Fayl ichidagi matn (faqat pdf, Tika orqali). Matn `TgFile.content_text` ga
+        ham yoziladi — Elasticsearch ishlamaganda bazadagi qidiruv undan foydalanadi.
         """
-        # Fayl turini modeldagi tayyor ma'lumotdan olamiz
-        file_type = instance.file_type
-
-        # Qaysi turdagi fayllarni o'qish kerakligini belgilaymiz
-        text_based_types = ['pdf']  # 'other' ichiga pptx, txt kabi turlar kiradi
-
-        # Agar fayl turi bizga keraklilardan bo'lmasa, bo'sh matn qaytaramiz
-        if file_type not in text_based_types:
-            return ""
-
-        # Agar fayl mavjud va hajmi 0 dan katta bo'lsa
-        if instance.file and instance.file.size > 0:
-            try:
-                instance.file.open('rb')
-                parsed = parser.from_buffer(instance.file.read())
-                instance.file.close()
-
-                if parsed and 'content' in parsed and parsed['content']:
-                    # Matn ichidagi ortiqcha probel va qatorlarni olib tashlash
-                    return ' '.join(str(parsed['content']).split())
-            except Exception as e:
-                # Agar Tika biror faylni o'qiy olmasa, xatolikni terminalga chiqaradi, lekin dasturni to'xtatmaydi
-                print(f"Tika faylni o'qishda xatolik: {instance.file.name}, Xato: {e}")
-
-        return ""
\ No newline at end of file
+        text = extract_text(instance)
+        store_content_text(instance, text)
+        return text
@@ -0,0 +1,92 @@
+# extraction.py
+
+import hashlib
+import logging
+from collections import Counter
+
+from tika import parser
+
+from .metrics import EXTRACTION_CACHE_REQUESTS
+from .models import ExtractedText, TgFile
+
+logger = logging.getLogger(__name__)
+
+# Qaysi turdagi fayllarning ichidagi matn o'qiladi ('other' ichiga pptx, txt kabi turlar kiradi)
+TEXT_BASED_TYPES = ['pdf']
+
+# Jarayon bo'yicha kesh statistikasi (hit/miss/error) — `search_index --populate` oxirida chiqariladi
+extraction_stats = Counter()
+
+
+def file_sha256(file) -> str:
+    """Fayl mazmunining SHA-256'i (bo'laklab o'qiladi — katta fayllar xotiraga to'liq yuklanmaydi)."""
+    digest = hashlib.sha256()
+    file.open('rb')
+    try:
+        for chunk in file.chunks():
+            digest.update(chunk)
+    finally:
+        file.close()
+    return digest.hexdigest()
+
+
+def tika_extract(file) -> str:
+    file.open('rb')
+    try:
+        parsed = parser.from_buffer(file.read())
+    finally:
+        file.close()
+    if parsed and parsed.get('content'):
+        # Matn ichidagi ortiqcha probel va qatorlarni olib tashlash
+        return ' '.join(str(parsed['content']).split())
+    return ""
+
+
+def extract_text(instance: TgFile) -> str:
+    """
+    Faqat matnli hujjatlar (pdf) ichidagi matn. Avval fayl SHA-256'i bo'yicha
+    `ExtractedText` keshidan qidiriladi; Tika faqat keshda yo'q bo'lsa chaqiriladi
+    (bo'sh natija ham keshlanadi). Rasm, video, arxiv kabi fayllar uchun bo'sh matn.
+    """
+    if instance.file_type not in TEXT_BASED_TYPES or not instance.file:
+        return ""
+    try:
+        if instance.file.size <= 0:
+            return ""
+        sha256 = file_sha256(instance.file)
+        cached = ExtractedText.objects.filter(sha256=sha256).first()
+        if cached is not None:
+            record_extraction("hit")
+            return cached.text
+        text = tika_extract(instance.file)
+    except Exception as e:
+        # Tika (yoki storage) faylni o'qiy olmasa, xatolik log'ga yoziladi, lekin indekslash to'xtamaydi
+        record_extraction("error")
+        logger.warning(f"Tika failed to extract text from {instance.file.name}: {e}")
+        return ""
+    ExtractedText.store(sha256, text)
+    record_extraction("miss")
+    return text
+
+
+def record_extraction(result: str) -> None:
+    extraction_stats[result] += 1
+    EXTRACTION_CACHE_REQUESTS.labels(result=result).inc()
+
+
+def extraction_summary() -> str:
+    hits, misses, errors = extraction_stats["hit"], extraction_stats["miss"], extraction_stats["error"]
+    total = hits + misses + errors
+    hit_rate = hits / total if total else 0.0
+    return (f"Extraction cache: {hits} hits, {misses} misses (Tika), {errors} errors, "
+            f"hit rate {hit_rate:.1%} of {total} text files")
+
+
+def store_content_text(instance: TgFile, text: str) -> None:
+    """
+    Ajratilgan matnni `TgFile.content_text` ga yozadi (bazadagi zaxira qidiruv uchun).
+    `update()` — save() signallari (va qayta indekslash) ishga tushmaydi.
+    """
+    if instance.pk and text != instance.content_text:
+        TgFile.objects.filter(pk=instance.pk).update(content_text=text)
+        instance.content_text = text
@@ -2,6 +2,7 @@ from django import forms
 
 from .models import SubscribeChannel
 from .models import check_bot_is_admin_in_channel
+from .telegram_http import run_async
 
 
 class SubscribeChannelForm(forms.ModelForm):
@@ -16,10 +17,7 @@ class SubscribeChannelForm(forms.ModelForm):
 
         # Bot adminligini asinxron tekshirish
         if channel_id and token:
-            import asyncio
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            bot_is_admin = loop.run_until_complete(check_bot_is_admin_in_channel(channel_id, token))
+            bot_is_admin = run_async(check_bot_is_admin_in_channel(channel_id, token))
             if not bot_is_admin:
                 raise forms.ValidationError("Bot kanal administratori emas.")
         return cleaned_data
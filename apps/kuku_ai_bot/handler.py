@@ -1,14 +1,16 @@
 # handler.py
 
+from django.conf import settings
 from telegram.ext import (
     Application, CommandHandler, MessageHandler, CallbackQueryHandler,
-    filters, ConversationHandler,
+    InlineQueryHandler, filters, ConversationHandler,
 )
 
 from .views import (
     start, ask_language, language_choice_handle,
     toggle_search_mode, help_handler, about_handler, share_bot_handler,
-    main_text_handler, handle_search_pagination, send_file_by_callback
+    main_text_handler, handle_search_pagination, handle_search_facet, send_file_by_callback,
+    inline_search_handler
 )
 from .admin_views import (
     admin_panel, stats, backup_db, export_users, secret_level,
@@ -19,6 +21,7 @@ from .broadcast_views import (
     cancel_broadcast_conversation, handle_broadcast_confirmation,
     AWAIT_BROADCAST_MESSAGE
 )
+from .telegram_http import get_request
 from .translation import (
     search, deep_search, help_text, about_us,
     share_bot_button, change_language, admin_button_text, text as restart_text
@@ -29,7 +32,15 @@ telegram_applications = {}
 
 def get_application(token: str) -> Application:
     if token not in telegram_applications:
-        application = Application.builder().token(token).build()
+        # Barcha botlar bitta umumiy ulanishlar havzasini ishlatadi (telegram_http.py).
+        # getUpdates (long-polling) ulanishni uzoq band qilgani uchun alohida so'rov obyektida qoladi.
+        application = (
+            Application.builder()
+            .token(token)
+            .base_url(settings.TELEGRAM_BOT_API_URL)
+            .request(get_request())
+            .build()
+        )
 
         broadcast_conv = ConversationHandler(
             entry_points=[CommandHandler("broadcast", start_broadcast_conversation)],
@@ -63,10 +74,14 @@ def get_application(token: str) -> Application:
             # --- Callback So'rovlari ---
             CallbackQueryHandler(handle_broadcast_confirmation, pattern="^brdcast_"),
             CallbackQueryHandler(handle_search_pagination, pattern="^search_"),
+            CallbackQueryHandler(handle_search_facet, pattern="^facet_"),
             CallbackQueryHandler(send_file_by_callback, pattern="^getfile_"),
             CallbackQueryHandler(language_choice_handle, pattern="^language_setting_"),
             CallbackQueryHandler(secret_level, pattern="^SCRT_LVL"),
 
+            # --- Inline rejim (@bot so'rov) ---
+            InlineQueryHandler(inline_search_handler),
+
             # --- Tugmalar va Maxsus Xabar Turlari ---
             MessageHandler(filters.Regex(f"^({'|'.join(search.values())}|{'|'.join(deep_search.values())})$"),
                            toggle_search_mode),
@@ -115,10 +115,12 @@ def make_keyboard_for_help_command() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(buttons)
 
 
-from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.error import BadRequest
 from asgiref.sync import sync_to_async
+from django.template.defaultfilters import filesizeformat
 from .models import SubscribeChannel
+from .telegram_http import get_bot
 from . import translation
 
 
@@ -138,7 +140,8 @@ async def keyboard_checked_subscription_channel(user_id, bot):
             # Endi channel.bot.token murojaati yangi DB so'rovini yubormaydi,
             # chunki 'bot' obyekti oldindan yuklab olingan.
             token = channel.bot.token
-            bot_instance = Bot(token=token)
+            # Bot obyekti va uning ulanishlar havzasi qayta ishlatiladi
+            bot_instance = get_bot(token)
 
             # Foydalanuvchining obunachiligini tekshirish
             chat_member = await bot_instance.get_chat_member(chat_id=channel.channel_id, user_id=user_id)
@@ -208,20 +211,30 @@ def default_keyboard(lang, admin=False) -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(buttons, resize_keyboard=True, one_time_keyboard=False)
 
 
-def build_search_results_keyboard(page_obj, files_on_page, search_mode, language):
+FILE_TYPE_ICONS = {'pdf': '📕', 'doc': '📄', 'zip': '🗜', 'media': '🎞', 'other': '📎'}
+# Natijalar ostida ko'rsatiladigan facet tugmalari soni
+MAX_FILE_TYPE_FACETS = 4
+MAX_SUBCATEGORY_FACETS = 3
+
+
+def build_search_results_keyboard(page_obj, session, language):
+    session_id = session.session_id
     buttons = []
-    # Build file buttons with a short callback data
-    for file in files_on_page:
-        buttons.append([InlineKeyboardButton(f"📄 {file.title}", callback_data=f"getfile_{file.id}")])
+    # Build file buttons from the search hits on the page (already in relevance order)
+    for file in page_obj.object_list:
+        label = f"{FILE_TYPE_ICONS.get(file.file_type, '📄')} {file.title}"
+        if file.size_in_bytes:
+            label += f" · {filesizeformat(file.size_in_bytes)}"
+        buttons.append([InlineKeyboardButton(label, callback_data=f"getfile_{file.id}")])
 
     # Add pagination buttons
     pagination_buttons = []
     if page_obj.has_previous():
         prev_page = page_obj.previous_page_number()
-        # The callback data is now short and does not include the query text
+        # The callback data only carries the search session id and the page
         pagination_buttons.append(
             InlineKeyboardButton(translation.pagination_prev[language],
-                                 callback_data=f"search_{search_mode}_{prev_page}")
+                                 callback_data=f"search_{session_id}_{prev_page}")
         )
 
     current_page_text = f"Page {page_obj.number}/{page_obj.paginator.num_pages}"
@@ -229,11 +242,36 @@ def build_search_results_keyboard(page_obj, files_on_page, search_mode, language
 
     if page_obj.has_next():
         next_page = page_obj.next_page_number()
-        # The callback data is now short and does not include the query text
+        # The callback data only carries the search session id and the page
         pagination_buttons.append(
             InlineKeyboardButton(translation.pagination_next[language],
-                                 callback_data=f"search_{search_mode}_{next_page}")
+                                 callback_data=f"search_{session_id}_{next_page}")
         )
 
     buttons.append(pagination_buttons)
+    buttons.extend(build_facet_buttons(session, language))
     return InlineKeyboardMarkup(buttons)
+
+
+def build_facet_buttons(session, language):
+    """
+    Fayl turi va subkategoriya bo'yicha filtr tugmalari (sessiyadagi facet sonlaridan).
+    Natijani toraytirmaydigan (bitta qiymatli yoki allaqachon tanlangan) facet'lar ko'rsatilmaydi.
+    """
+    rows = []
+    file_types = session.facets.get('file_type', [])
+    if len(file_types) > 1 and 'file_type' not in session.filters:
+        rows.append([
+            InlineKeyboardButton(f"{FILE_TYPE_ICONS.get(item['value'], '📄')} {item['value'].upper()} ({item['count']})",
+                                 callback_data=f"facet_{session.session_id}_t_{item['value']}")
+            for item in file_types[:MAX_FILE_TYPE_FACETS]
+        ])
+    subcategories = session.facets.get('subcategory', [])
+    if len(subcategories) > 1 and 'subcategory' not in session.filters:
+        for item in subcategories[:MAX_SUBCATEGORY_FACETS]:
+            rows.append([InlineKeyboardButton(f"📂 {item['label']} ({item['count']})",
+                                              callback_data=f"facet_{session.session_id}_s_{item['value']}")])
+    if session.filters:
+        rows.append([InlineKeyboardButton(translation.facet_clear[language],
+                                          callback_data=f"facet_{session.session_id}_x_0")])
+    return rows
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import statistics
+import time
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.shortcuts import get_object_or_404
+from telegram import Update
+
+from ... import registry
+from ...handler import get_application
+from ...models import Bot
+
+# Oddiy qidiruv so'rovi ko'rinishidagi update (parse/dispatch benchmark'i uchun)
+SAMPLE_UPDATE = orjson.dumps({
+    "update_id": 912345678,
+    "message": {
+        "message_id": 4321,
+        "from": {"id": 123456789, "is_bot": False, "first_name": "Ali", "last_name": "Valiyev",
+                 "username": "ali_valiyev", "language_code": "uz"},
+        "chat": {"id": 123456789, "first_name": "Ali", "last_name": "Valiyev",
+                 "username": "ali_valiyev", "type": "private"},
+        "date": 1760000000,
+        "text": "oliy matematika ma'ruzalar",
+    },
+})
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = ("Webhook hot-path benchmark: bot lookup via DB vs in-memory registry, "
+            "and body parse / de_json / handler routing micro-benchmarks (p50/p99)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=2000)
+        parser.add_argument("--token", type=str, default=None, help="Bot token (default: first bot in DB)")
+        parser.add_argument("--case", choices=["lookup", "parse", "all"], default="all")
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        if options["case"] in ("parse", "all"):
+            self.run_parse(iterations)
+        if options["case"] in ("lookup", "all"):
+            token = options["token"] or Bot.objects.values_list("token", flat=True).first()
+            if not token:
+                raise CommandError("No bots found")
+            asyncio.run(self.run_lookup(token, iterations))
+
+    async def run_lookup(self, token: str, iterations: int):
+        await registry.aload()
+        cases = {
+            "db": lambda: sync_to_async(get_object_or_404)(Bot, token=token),
+            "registry": lambda: registry.aget(token),
+        }
+        for name, lookup in cases.items():
+            samples = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                await lookup()
+                samples.append((time.perf_counter() - started) * 1000)
+            self.report(name, samples)
+        await registry.stop_listener()
+
+    def run_parse(self, iterations: int):
+        # Application tarmoqqa chiqmasdan quriladi: faqat handler grafi kerak
+        application = get_application("123456:BENCHMARK-TOKEN")
+        data = orjson.loads(SAMPLE_UPDATE)
+        update = Update.de_json(data, application.bot)
+
+        def route():
+            # Application.process_update ichidagi handler tanlash bosqichi
+            for handlers in application.handlers.values():
+                for handler in handlers:
+                    if handler.check_update(update) not in (None, False):
+                        break
+
+        cases = {
+            "json": lambda: json.loads(SAMPLE_UPDATE.decode("utf-8")),
+            "orjson": lambda: orjson.loads(SAMPLE_UPDATE),
+            "de_json": lambda: Update.de_json(data, application.bot),
+            "route": route,
+        }
+        for name, func in cases.items():
+            samples = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                func()
+                samples.append((time.perf_counter() - started) * 1000)
+            self.report(name, samples)
+
+    def report(self, name: str, samples: list[float]):
+        self.stdout.write(
+            f"{name:>10}: p50={percentile(samples, 50):.3f}ms "
+            f"p99={percentile(samples, 99):.3f}ms mean={statistics.mean(samples):.3f}ms n={len(samples)}"
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from ...extraction import TEXT_BASED_TYPES, extract_text, extraction_summary, store_content_text
+from ...models import TgFile
+
+
+class Command(BaseCommand):
+    help = ("Matnli fayllar (pdf) ichidagi matnni Tika bilan ajratib `TgFile.content_text` ga yozadi — "
+            "bazadagi qidiruvning deep rejimi uchun (SEARCH_BACKEND=database yoki ES indekslanmagan bo'lsa)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Matni allaqachon bor fayllarni ham qayta o'qish")
+
+    def handle(self, *args, **options):
+        files = TgFile.objects.filter(file_type__in=TEXT_BASED_TYPES)
+        if not options["all"]:
+            files = files.filter(content_text='')
+        extracted = 0
+        for tg_file in files.iterator(chunk_size=100):
+            text = extract_text(tg_file)
+            store_content_text(tg_file, text)
+            extracted += bool(text)
+        self.stdout.write(f"Extracted text from {extracted} files")
+        self.stdout.write(extraction_summary())
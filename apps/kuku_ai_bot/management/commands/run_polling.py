@@ -0,0 +1,71 @@
+import asyncio
+import logging
+
+from django.core.management.base import BaseCommand
+from telegram import Update
+from telegram.error import TelegramError
+
+from ... import bootstrap, registry
+from ...scheduler import lane_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ("Barcha botlar uchun bitta asyncio loop'da getUpdates long-polling'ni ishga tushiradi "
+            "(webhook'siz: NAT ortidagi serverlar va lokal soxta Bot API bilan load test uchun)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=None,
+                            help="Bir vaqtda qayta ishlanadigan update'lar soni (default: BOT_UPDATE_CONCURRENCY)")
+        parser.add_argument("--limit", type=int, default=100, help="Bitta getUpdates'dagi update'lar soni (1-100)")
+        parser.add_argument("--timeout", type=int, default=30, help="Long-polling timeout (soniya)")
+        parser.add_argument("--delete-webhook", action="store_true",
+                            help="Polling'dan oldin webhook'ni o'chirish (aks holda getUpdates Conflict qaytaradi)")
+
+    def handle(self, *args, **options):
+        if options["concurrency"]:
+            lane_scheduler.max_concurrency = options["concurrency"]
+        asyncio.run(self.run(options))
+
+    async def run(self, options):
+        await bootstrap.startup()
+        tasks = []
+        try:
+            for bot_instance in registry.all_bots():
+                application = await bootstrap.ensure_application(bot_instance)
+                if options["delete_webhook"]:
+                    await application.bot.delete_webhook()
+                tasks.append(asyncio.create_task(
+                    self.poll(bot_instance, application, options["limit"], options["timeout"])
+                ))
+            self.stdout.write(self.style.SUCCESS(f"Polling started for {len(tasks)} bot(s)"))
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await bootstrap.shutdown()
+
+    async def poll(self, bot_instance, application, limit: int, timeout: int):
+        offset = None
+        backoff = 1
+        while True:
+            try:
+                updates = await application.bot.get_updates(
+                    offset=offset, limit=limit, timeout=timeout, allowed_updates=Update.ALL_TYPES
+                )
+            except TelegramError as e:
+                logger.warning(f"getUpdates failed for bot {bot_instance}: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+                continue
+            backoff = 1
+            if not updates:
+                continue
+            # Bitta chat'ning update'lari lane'da tartib bilan, turli chat'lar parallel bajariladi.
+            # Offset batch to'liq qayta ishlangandan keyin suriladi (at-least-once).
+            await asyncio.gather(
+                *(lane_scheduler.run(application, update) for update in updates),
+                return_exceptions=True,
+            )
+            offset = updates[-1].update_id + 1
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+
+from django.core.management.base import BaseCommand
+from prometheus_client import start_http_server
+from telegram.error import TelegramError
+
+from ... import bootstrap, registry
+from ...update_stream import StreamConsumer
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Redis stream'dagi Telegram update'larini consumer group worker'lari orqali qayta ishlaydi"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--consumers", type=int, default=4, help="Har bir bot uchun consumer soni")
+        parser.add_argument("--count", type=int, default=10, help="Bitta XREADGROUP'da olinadigan xabarlar soni")
+        parser.add_argument("--block", type=int, default=5000, help="XREADGROUP block vaqti (ms)")
+        parser.add_argument("--claim-idle", type=int, default=60000,
+                            help="Shuncha ms ACK qilinmagan pending xabarlar qayta olinadi")
+        parser.add_argument("--metrics-port", type=int, default=0, help="Prometheus metrikalari porti (0 — o'chiq)")
+
+    def handle(self, *args, **options):
+        if options["metrics_port"]:
+            start_http_server(options["metrics_port"])
+        asyncio.run(self.run(options))
+
+    async def run(self, options):
+        await bootstrap.startup()
+        self.options = options
+        # bot_id -> (token, consumer task'lari)
+        self.consumers: dict[int, tuple[str, list[asyncio.Task]]] = {}
+        # Ishlab turganda qo'shilgan/o'zgargan botlar registr pub/sub'i orqali keladi
+        changed = asyncio.Event()
+        registry.on_change(lambda bot_id: changed.set())
+        try:
+            while True:
+                changed.clear()
+                await self.sync_consumers()
+                await changed.wait()
+        finally:
+            for _, tasks in self.consumers.values():
+                for task in tasks:
+                    task.cancel()
+            await bootstrap.shutdown()
+
+    async def sync_consumers(self) -> None:
+        """Registrdagi har bir bot uchun consumer'larni ishga tushiradi, o'chirilgan botlarnikini to'xtatadi."""
+        bots = {bot_instance.pk: bot_instance for bot_instance in registry.all_bots()}
+        for bot_id, (token, tasks) in list(self.consumers.items()):
+            bot_instance = bots.get(bot_id)
+            if bot_instance is not None and bot_instance.token == token and not all(t.done() for t in tasks):
+                continue
+            for task in tasks:
+                task.cancel()
+            del self.consumers[bot_id]
+            logger.info(f"Stream consumers stopped for bot {bot_id}")
+        for bot_id, bot_instance in bots.items():
+            if bot_id not in self.consumers:
+                await self.start_consumers(bot_instance)
+
+    async def start_consumers(self, bot_instance) -> None:
+        try:
+            application = await bootstrap.ensure_application(bot_instance)
+        except TelegramError as e:
+            logger.error(f"Failed to initialize bot {bot_instance}, stream consumers not started: {e}")
+            return
+        tasks = []
+        for index in range(self.options["consumers"]):
+            consumer = StreamConsumer(
+                bot_instance, index,
+                count=self.options["count"], block_ms=self.options["block"],
+                claim_idle_ms=self.options["claim_idle"],
+            )
+            task = asyncio.create_task(consumer.run(application))
+            task.add_done_callback(self.consumer_done)
+            tasks.append(task)
+        self.consumers[bot_instance.pk] = (bot_instance.token, tasks)
+        self.stdout.write(self.style.SUCCESS(f"{len(tasks)} stream consumer(s) started for {bot_instance}"))
+
+    @staticmethod
+    def consumer_done(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Stream consumer stopped with error: {task.exception()!r}")
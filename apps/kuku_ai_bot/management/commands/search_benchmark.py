@@ -0,0 +1,144 @@
+import asyncio
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from elasticsearch.helpers import parallel_bulk
+from elasticsearch_dsl import Index, Search
+from elasticsearch_dsl.connections import connections
+from elasticsearch_dsl.query import QueryString
+
+from ...documents import TgFileDocument
+from ...search import build_search_query, close_async_client, get_async_client
+from ...synthetic import generate_documents, generate_queries
+
+# Eski mapping: barcha matn maydonlari default (standard) analyzer bilan
+LEGACY_MAPPING = {
+    'properties': {
+        'title': {'type': 'text'},
+        'description': {'type': 'text'},
+        'file_name': {'type': 'text'},
+        'file_type': {'type': 'text'},
+        'content': {'type': 'text'},
+    }
+}
+LEGACY_FIELDS = ['title^5', 'description^1', 'file_name^4']
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = ("Sintetik korpusda eski leading-wildcard QueryString va yangi analyzed "
+            "multi_match qidiruvining kechikishini solishtiradi")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--docs", type=int, default=1_000_000, help="Sintetik hujjatlar soni")
+        parser.add_argument("--queries", type=int, default=500)
+        parser.add_argument("--mode", choices=["normal", "deep"], default="normal")
+        parser.add_argument("--index-prefix", default="tg_files_bench")
+        parser.add_argument("--skip-index", action="store_true", help="Mavjud benchmark indekslaridan foydalanish")
+        parser.add_argument("--loop-lag", action="store_true",
+                            help="Event loop ichida sinxron va async klient bilan qidiruvda loop kechikishini o'lchash")
+        parser.add_argument("--concurrency", type=int, default=32, help="--loop-lag uchun parallel so'rovlar soni")
+
+    def handle(self, *args, **options):
+        client = connections.get_connection()
+        legacy_name = f"{options['index_prefix']}_legacy"
+        analyzed_name = f"{options['index_prefix']}_analyzed"
+
+        if not options["skip_index"]:
+            legacy = Index(legacy_name)
+            legacy.settings(number_of_shards=1, number_of_replicas=0)
+            analyzed = TgFileDocument._index.clone(name=analyzed_name)
+            for index in (legacy, analyzed):
+                index.delete(ignore_unavailable=True)
+            legacy.create()
+            client.indices.put_mapping(index=legacy_name, body=LEGACY_MAPPING)
+            analyzed.create()
+            for name in (legacy_name, analyzed_name):
+                self.index_corpus(client, name, options["docs"])
+
+        queries = generate_queries(options["queries"])
+        legacy_fields = LEGACY_FIELDS + (['content^3'] if options["mode"] == "deep" else [])
+        cases = {
+            "legacy_wildcard": lambda q: Search(using=client, index=legacy_name).query(
+                QueryString(query=f"*{q}*", fields=legacy_fields, default_operator='AND')),
+            "multi_match": lambda q: Search(using=client, index=analyzed_name).query(
+                build_search_query(q, options["mode"])),
+        }
+        for name, build in cases.items():
+            self.run_case(name, build, queries)
+
+        if options["loop_lag"]:
+            asyncio.run(self.run_loop_lag(client, analyzed_name, queries, options["mode"], options["concurrency"]))
+
+    def index_corpus(self, client, index_name: str, count: int):
+        started = time.perf_counter()
+        actions = (
+            {"_index": index_name, "_id": i, "_source": doc}
+            for i, doc in enumerate(generate_documents(count))
+        )
+        for ok, info in parallel_bulk(client, actions, chunk_size=2000, thread_count=4):
+            if not ok:
+                self.stderr.write(f"Indexing error: {info}")
+        client.indices.refresh(index=index_name)
+        self.stdout.write(f"Indexed {count} docs into {index_name} in {time.perf_counter() - started:.1f}s")
+
+    def run_case(self, name: str, build, queries: list[str]):
+        wall, took, zero = [], [], 0
+        for query in queries:
+            started = time.perf_counter()
+            response = build(query)[:10].execute()
+            wall.append((time.perf_counter() - started) * 1000)
+            took.append(response.took)
+            zero += response.hits.total.value == 0
+        self.stdout.write(
+            f"{name:>16}: p50={percentile(wall, 50):.1f}ms p95={percentile(wall, 95):.1f}ms "
+            f"p99={percentile(wall, 99):.1f}ms es_took_p50={percentile(took, 50)}ms "
+            f"mean={statistics.mean(wall):.1f}ms zero_results={zero}/{len(queries)}"
+        )
+
+    async def run_loop_lag(self, client, index_name: str, queries: list[str], mode: str, concurrency: int):
+        """
+        Bot handler'lari kabi bir event loop'da `concurrency` ta parallel qidiruv
+        ishlatiladi; fon'dagi ticker har 10ms da loop qancha kechikib uyg'onganini yozadi.
+        """
+        async def sync_search(query):
+            # Avvalgi handler'lar kabi: sinxron so'rov to'g'ridan-to'g'ri loop ichida
+            Search(using=client, index=index_name).query(build_search_query(query, mode))[:10].execute()
+
+        async def async_search(query):
+            body = Search().query(build_search_query(query, mode))[:10].to_dict()
+            await get_async_client().search(index=index_name, body=body)
+
+        for name, search in {"sync_in_loop": sync_search, "async_client": async_search}.items():
+            lags = []
+            stop = asyncio.Event()
+
+            async def ticker():
+                while not stop.is_set():
+                    expected = time.perf_counter() + 0.01
+                    await asyncio.sleep(0.01)
+                    lags.append(max(0.0, (time.perf_counter() - expected) * 1000))
+
+            pending = iter(queries)
+
+            async def worker():
+                for query in pending:
+                    await search(query)
+
+            tick_task = asyncio.create_task(ticker())
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+            stop.set()
+            await tick_task
+            self.stdout.write(
+                f"{name:>16}: loop_lag_p50={percentile(lags, 50):.1f}ms p99={percentile(lags, 99):.1f}ms "
+                f"max={max(lags):.1f}ms throughput={len(queries) / elapsed:.0f} q/s"
+            )
+        await close_async_client()
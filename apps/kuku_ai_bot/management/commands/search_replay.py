@@ -0,0 +1,147 @@
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from elasticsearch.helpers import parallel_bulk
+from elasticsearch_dsl.connections import connections
+
+from ...documents import TgFileDocument
+from ...models import SearchQuery
+from ...search import PAGE_SIZE, asearch_cascade, close_async_client, use_index
+from ...search_cache import search_cache
+from ...synthetic import generate_documents, generate_queries
+from .search_benchmark import percentile
+
+
+class Command(BaseCommand):
+    help = ("Qidiruv servisi benchmark'i: sintetik TgFile korpusini alohida indeksga yozadi va "
+            "SearchQuery'dagi real so'rovlarni berilgan QPS bilan qayta yuboradi "
+            "(p50/p95/p99, throughput, natijasiz so'rovlar ulushi; JSON hisobot)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--docs", type=int, default=100_000, help="Sintetik hujjatlar soni")
+        parser.add_argument("--index", default="tg_files_replay", help="Benchmark indeksi (prod indeksiga tegmaydi)")
+        parser.add_argument("--skip-index", action="store_true", help="Mavjud benchmark indeksidan foydalanish")
+        parser.add_argument("--queries", type=int, default=1000, help="SearchQuery'dan olinadigan so'rovlar soni")
+        parser.add_argument("--queries-file", default=None,
+                            help="So'rovlar fayli (har qatorda bitta), SearchQuery o'rniga")
+        parser.add_argument("--qps", type=float, default=50.0, help="Maqsadli so'rovlar tezligi")
+        parser.add_argument("--modes", default="normal,deep")
+        parser.add_argument("--with-cache", action="store_true", help="Redis qidiruv keshini yoqish")
+        parser.add_argument("--output", default=None, help="JSON hisobot fayli")
+
+    def handle(self, *args, **options):
+        if not options["skip_index"]:
+            self.index_corpus(options["index"], options["docs"])
+
+        queries = self.load_queries(options)
+        if not queries:
+            raise CommandError("No queries to replay")
+        modes = [mode.strip() for mode in options["modes"].split(",") if mode.strip()]
+        # Kesh yoqilmasa har bir so'rov Elasticsearch'ga boradi (takroriy so'rovlar tezlashib ketmaydi)
+        search_cache.enabled = options["with_cache"]
+
+        results = asyncio.run(self.replay_all(options["index"], queries, modes, options["qps"]))
+        report = {
+            "config": {
+                "index": options["index"],
+                "docs": None if options["skip_index"] else options["docs"],
+                "queries": len(queries),
+                "qps": options["qps"],
+                "cache": options["with_cache"],
+                "page_size": PAGE_SIZE,
+                "fallback_budget_ms": settings.SEARCH_FALLBACK_BUDGET_MS,
+            },
+            "results": results,
+        }
+        for mode, result in results.items():
+            self.stdout.write(
+                f"{mode:>8}: p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms "
+                f"throughput={result['throughput_qps']} q/s zero_rate={result['zero_result_rate']} "
+                f"errors={result['errors']} tiers={result['tiers']}"
+            )
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True, ensure_ascii=False)
+                f.write("\n")
+            self.stdout.write(f"Report written to {options['output']}")
+
+    def index_corpus(self, index_name: str, count: int):
+        client = connections.get_connection()
+        index = TgFileDocument._index.clone(name=index_name)
+        index.delete(ignore_unavailable=True)
+        index.create()
+        started = time.perf_counter()
+        actions = (
+            {"_index": index_name, "_id": i, "_source": doc}
+            for i, doc in enumerate(generate_documents(count), start=1)
+        )
+        for ok, info in parallel_bulk(client, actions, chunk_size=2000, thread_count=4):
+            if not ok:
+                self.stderr.write(f"Indexing error: {info}")
+        client.indices.refresh(index=index_name)
+        self.stdout.write(f"Indexed {count} docs into {index_name} in {time.perf_counter() - started:.1f}s")
+
+    def load_queries(self, options) -> list[str]:
+        if options["queries_file"]:
+            with open(options["queries_file"]) as f:
+                return [line.strip() for line in f if line.strip()][:options["queries"]]
+        # Eng so'nggi real so'rovlar, takrorlari bilan (mashhur so'rovlar ulushi saqlanadi)
+        queries = list(
+            SearchQuery.objects.order_by("-created_at").values_list("query_text", flat=True)[:options["queries"]]
+        )
+        if not queries:
+            self.stderr.write("SearchQuery is empty, falling back to synthetic queries")
+            queries = generate_queries(options["queries"])
+        return queries
+
+    async def replay_all(self, index_name: str, queries: list[str], modes: list[str], qps: float) -> dict:
+        results = {}
+        with use_index(index_name):
+            for mode in modes:
+                results[mode] = await self.replay(queries, mode, qps)
+        await close_async_client()
+        return results
+
+    async def replay(self, queries: list[str], mode: str, qps: float) -> dict:
+        """
+        Ochiq sikl: i-so'rov `start + i / qps` da yuboriladi, oldingilarini kutmaydi.
+        Kechikish rejalashtirilgan vaqtdan hisoblanadi — servis sekinlashsa navbat ham natijaga kiradi.
+        """
+        latencies, tiers, errors = [], Counter(), 0
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        async def one(index: int, query: str):
+            nonlocal errors
+            scheduled = start + index / qps
+            await asyncio.sleep(max(0.0, scheduled - loop.time()))
+            try:
+                tier, _ = await asearch_cascade(query, mode, page_size=PAGE_SIZE,
+                                                with_facets=True)
+            except Exception:
+                errors += 1
+                return
+            latencies.append((loop.time() - scheduled) * 1000)
+            tiers[tier or "none"] += 1
+
+        await asyncio.gather(*(one(i, q) for i, q in enumerate(queries)))
+        elapsed = loop.time() - start
+        if not latencies:
+            raise CommandError(f"All {len(queries)} queries failed in {mode} mode")
+        return {
+            "count": len(queries),
+            "errors": errors,
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "mean_ms": round(statistics.mean(latencies), 1),
+            "max_ms": round(max(latencies), 1),
+            "throughput_qps": round(len(latencies) / elapsed, 1),
+            "zero_result_rate": round(tiers["none"] / len(latencies), 4),
+            "tiers": dict(sorted(tiers.items())),
+        }
@@ -0,0 +1,68 @@
+# metrics.py
+# Prometheus metrikalari. /metrics/ endpoint'i django_prometheus orqali
+# prometheus_client'ning global registry'sini eksport qiladi.
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# --- Takroriy update'lar (Telegram retry) ---
+UPDATE_DUPLICATES = Counter(
+    "kuku_update_duplicates_dropped_total", "Redelivered updates dropped by the dedup layer", ["layer"])
+
+# --- Update navbati (BOT_UPDATE_MODE=queue) ---
+UPDATE_QUEUE_DEPTH = Gauge(
+    "kuku_update_queue_depth", "Updates waiting in the in-process queue")
+UPDATE_QUEUE_ENQUEUED = Counter(
+    "kuku_update_queue_enqueued_total", "Updates accepted into the in-process queue")
+UPDATE_QUEUE_REJECTED = Counter(
+    "kuku_update_queue_rejected_total", "Updates rejected or dropped because the queue was full", ["policy"])
+UPDATE_QUEUE_WAIT = Histogram(
+    "kuku_update_queue_wait_seconds", "Time an update spent in the queue before processing")
+UPDATE_PROCESSING_TIME = Histogram(
+    "kuku_update_processing_seconds", "Time spent in Application.process_update")
+
+# --- Per-chat lane scheduler ---
+UPDATE_LANES_ACTIVE = Gauge(
+    "kuku_update_lanes_active", "Chat lanes that currently have queued or running updates")
+UPDATE_LANE_DEPTH = Histogram(
+    "kuku_update_lane_depth", "Lane depth observed when an update is submitted",
+    buckets=(1, 2, 3, 5, 10, 20, 50))
+UPDATE_LANE_WAIT = Histogram(
+    "kuku_update_lane_wait_seconds", "Time from lane submission until processing starts")
+
+# --- Redis Stream orqali qabul qilish (BOT_UPDATE_MODE=stream) ---
+UPDATE_STREAM_LAG = Gauge(
+    "kuku_update_stream_lag", "Stream entries not yet delivered to the consumer group", ["bot"])
+UPDATE_STREAM_PENDING = Gauge(
+    "kuku_update_stream_pending", "Stream entries delivered but not yet acknowledged", ["bot"])
+UPDATE_STREAM_PROCESSED = Counter(
+    "kuku_update_stream_processed_total", "Stream entries processed and acknowledged", ["bot"])
+UPDATE_STREAM_RECLAIMED = Counter(
+    "kuku_update_stream_reclaimed_total", "Pending stream entries reclaimed from idle consumers", ["bot"])
+
+# --- Telegram Bot API uchun umumiy HTTP havza ---
+TELEGRAM_HTTP_REQUESTS = Counter(
+    "kuku_telegram_http_requests_total", "Outbound Bot API requests sent through the shared pool")
+TELEGRAM_HTTP_NEW_CONNECTIONS = Counter(
+    "kuku_telegram_http_new_connections_total", "New TCP connections opened by the shared pool")
+
+# --- Qidiruv keshi ---
+SEARCH_CACHE_REQUESTS = Counter(
+    "kuku_search_cache_requests_total", "Search cache lookups by result (hit, miss, stale, error, hot_hit, hot_miss)", ["result"])
+INLINE_QUERY_TIME = Histogram(
+    "kuku_inline_query_seconds", "Time to build the answer to an inline query",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 1.0))
+SEARCH_TIER_ANSWERS = Counter(
+    "kuku_search_tier_answers_total", "Bot searches by the fallback tier that returned hits (none if all were empty)",
+    ["tier"])
+
+# --- Qidiruv backend'lari va circuit breaker ---
+SEARCH_BACKEND_REQUESTS = Counter(
+    "kuku_search_backend_requests_total", "Bot searches by backend and result (ok, error, slow)", ["backend", "result"])
+SEARCH_BREAKER_OPEN = Gauge(
+    "kuku_search_breaker_open", "1 while the Elasticsearch circuit breaker routes searches to the database fallback")
+
+# --- Qidiruv indeksini fon rejimida yangilash (Celery) ---
+SEARCH_INDEX_DOCS = Counter(
+    "kuku_search_index_docs_total", "TgFile documents sent to Elasticsearch by the indexing worker", ["result"])
+EXTRACTION_CACHE_REQUESTS = Counter(
+    "kuku_extraction_cache_requests_total", "Content extraction lookups by SHA-256 (hit, miss, error)", ["result"])
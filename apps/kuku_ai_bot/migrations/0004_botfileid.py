@@ -0,0 +1,27 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kuku_ai_bot', '0003_category_alter_subscribechannel_bot_subcategory_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BotFileId',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_id', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('bot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='file_ids', to='kuku_ai_bot.bot')),
+                ('tg_file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bot_file_ids', to='kuku_ai_bot.tgfile')),
+            ],
+            options={
+                'verbose_name': 'Telegram file_id',
+                'verbose_name_plural': "Telegram file_id'lar",
+                'unique_together': {('bot', 'tg_file')},
+            },
+        ),
+    ]
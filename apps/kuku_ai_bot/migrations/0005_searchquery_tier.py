@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kuku_ai_bot', '0004_botfileid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchquery',
+            name='tier',
+            field=models.CharField(blank=True, choices=[('exact', 'Exact'), ('fuzzy', 'Fuzzy'), ('deep', 'Deep (content)')], max_length=10, null=True),
+        ),
+    ]
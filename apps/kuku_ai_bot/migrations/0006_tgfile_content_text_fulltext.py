@@ -0,0 +1,102 @@
+from django.db import migrations, models
+
+# Zaxira (bazadagi) full-text qidiruv indekslari. Ifodalar search_backends.py
+# dagi so'rovlar bilan bir xil bo'lishi kerak — aks holda indeks ishlatilmaydi.
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX IF NOT EXISTS kuku_ai_bot_tgfile_fts_normal ON kuku_ai_bot_tgfile USING gin ((
+        to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(file_name, '') || ' ' || coalesce(description, ''))
+    ))
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS kuku_ai_bot_tgfile_fts_deep ON kuku_ai_bot_tgfile USING gin ((
+        to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(file_name, '') || ' ' || coalesce(description, '')
+                    || ' ' || coalesce(content_text, ''))
+    ))
+    """,
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS kuku_ai_bot_tgfile_fts_normal",
+    "DROP INDEX IF EXISTS kuku_ai_bot_tgfile_fts_deep",
+]
+
+# SQLite (DEBUG): TgFile jadvaliga bog'langan FTS5 jadvali, trigger'lar bilan yangilanadi
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS kuku_ai_bot_tgfile_fts USING fts5(
+        title, file_name, description, content_text,
+        content='kuku_ai_bot_tgfile', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    # `rank` ustuni: sarlavha va fayl nomi tavsifdan og'irroq
+    "INSERT INTO kuku_ai_bot_tgfile_fts(kuku_ai_bot_tgfile_fts, rank) VALUES ('rank', 'bm25(5.0, 4.0, 1.0, 2.0)')",
+    """
+    CREATE TRIGGER IF NOT EXISTS kuku_ai_bot_tgfile_fts_ai AFTER INSERT ON kuku_ai_bot_tgfile BEGIN
+        INSERT INTO kuku_ai_bot_tgfile_fts(rowid, title, file_name, description, content_text)
+        VALUES (new.id, new.title, new.file_name, new.description, new.content_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS kuku_ai_bot_tgfile_fts_ad AFTER DELETE ON kuku_ai_bot_tgfile BEGIN
+        INSERT INTO kuku_ai_bot_tgfile_fts(kuku_ai_bot_tgfile_fts, rowid, title, file_name, description, content_text)
+        VALUES ('delete', old.id, old.title, old.file_name, old.description, old.content_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS kuku_ai_bot_tgfile_fts_au AFTER UPDATE ON kuku_ai_bot_tgfile BEGIN
+        INSERT INTO kuku_ai_bot_tgfile_fts(kuku_ai_bot_tgfile_fts, rowid, title, file_name, description, content_text)
+        VALUES ('delete', old.id, old.title, old.file_name, old.description, old.content_text);
+        INSERT INTO kuku_ai_bot_tgfile_fts(rowid, title, file_name, description, content_text)
+        VALUES (new.id, new.title, new.file_name, new.description, new.content_text);
+    END
+    """,
+    "INSERT INTO kuku_ai_bot_tgfile_fts(kuku_ai_bot_tgfile_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS kuku_ai_bot_tgfile_fts_ai",
+    "DROP TRIGGER IF EXISTS kuku_ai_bot_tgfile_fts_ad",
+    "DROP TRIGGER IF EXISTS kuku_ai_bot_tgfile_fts_au",
+    "DROP TABLE IF EXISTS kuku_ai_bot_tgfile_fts",
+]
+
+STATEMENTS = {
+    'postgresql': (POSTGRES_FORWARD, POSTGRES_BACKWARD),
+    'sqlite': (SQLITE_FORWARD, SQLITE_BACKWARD),
+}
+
+
+def run_statements(schema_editor, backward=False):
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    if statements is None:
+        return
+    for sql in statements[1 if backward else 0]:
+        schema_editor.execute(sql)
+
+
+def create_fulltext_index(apps, schema_editor):
+    run_statements(schema_editor)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    run_statements(schema_editor, backward=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kuku_ai_bot', '0005_searchquery_tier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tgfile',
+            name='content_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AlterField(
+            model_name='searchquery',
+            name='tier',
+            field=models.CharField(blank=True, choices=[('exact', 'Exact'), ('fuzzy', 'Fuzzy'), ('deep', 'Deep (content)'), ('database', 'Database (fallback)')], max_length=10, null=True),
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kuku_ai_bot', '0006_tgfile_content_text_fulltext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractedText',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Ajratilgan matn',
+                'verbose_name_plural': 'Ajratilgan matnlar',
+            },
+        ),
+    ]
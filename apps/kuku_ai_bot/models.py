@@ -1,7 +1,7 @@
 # models.py (Refactored and Optimized Version)
-import asyncio
 import logging
 import os  # fayl kengaytmasini olish uchunk
+import zlib
 
 import magic
 import requests
@@ -11,9 +11,10 @@ from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.db import models
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from telegram import Bot as TelegramBot
 from telegram.error import TelegramError
 
+from .telegram_http import get_bot, run_async
+
 # Katta loyihalarda print o'rniga logging dan foydalanish tavsiya etiladi
 logger = logging.getLogger(__name__)
 
@@ -99,7 +100,7 @@ async def check_bot_is_admin_in_channel(channel_id: str, telegram_token: str) ->
     """
     logger.info(f"Checking admin status for bot in channel {channel_id}")
     try:
-        bot = TelegramBot(token=telegram_token)
+        bot = get_bot(telegram_token)
         bot_info = await bot.get_me()
         print(bot_info)
         admins = await bot.get_chat_administrators(chat_id=channel_id)
@@ -214,9 +215,9 @@ class SubscribeChannel(models.Model):
         # --- O'ZGARTIRILGAN QISM ---
         if self.bot and self.bot.token and self.channel_id:
             try:
-                # Sinxron `clean` metodi ichidan asinxron funksiyani
-                # `asyncio.run()` yordamida ishga tushiramiz.
-                is_admin = asyncio.run(
+                # Sinxron `clean` metodi ichidan asinxron funksiyani thread'ning
+                # doimiy event loop'ida ishga tushiramiz (ulanishlar qayta ishlatiladi).
+                is_admin = run_async(
                     check_bot_is_admin_in_channel(self.channel_id, self.bot.token)
                 )
                 print(f"Admin status for {self.channel_id}: {is_admin}")
@@ -344,10 +345,18 @@ class BroadcastRecipient(models.Model):
 
 
 class SearchQuery(models.Model):
+    TIER_CHOICES = (
+        ('exact', 'Exact'),
+        ('fuzzy', 'Fuzzy'),
+        ('deep', 'Deep (content)'),
+        ('database', 'Database (fallback)'),
+    )
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_queries')
     query_text = models.CharField(max_length=500)
     found_results = models.BooleanField(default=False)
     is_deep_search = models.BooleanField(default=False)
+    # Natija bergan fallback tier (natija bo'lmasa — bo'sh)
+    tier = models.CharField(max_length=10, choices=TIER_CHOICES, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -405,6 +414,8 @@ class TgFile(models.Model):
     uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     size_in_bytes = models.BigIntegerField(default=0)
     require_subscription = models.BooleanField(default=True)
+    # Tika ajratib olgan matn: Elasticsearch ishlamaganda bazadagi full-text qidiruv uchun
+    content_text = models.TextField(blank=True, default='', editable=False)
 
     class Meta:
         ordering = ['-uploaded_at']
@@ -440,6 +451,54 @@ class TgFile(models.Model):
         return self.title
 
 
+class BotFileId(models.Model):
+    """
+    Telegram'ga bir marta yuklangan faylning shu botdagi `file_id`si.
+
+    file_id botga bog'liq, shuning uchun (bot, fayl) juftligi bo'yicha saqlanadi.
+    Keyingi yuborishlar faylni qayta yuklamaydi, inline rejim esa faqat shu
+    yozuvlari bor fayllarni natija sifatida ko'rsata oladi.
+    """
+    bot = models.ForeignKey(Bot, on_delete=models.CASCADE, related_name='file_ids')
+    tg_file = models.ForeignKey(TgFile, on_delete=models.CASCADE, related_name='bot_file_ids')
+    file_id = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('bot', 'tg_file')
+        verbose_name = _("Telegram file_id")
+        verbose_name_plural = _("Telegram file_id'lar")
+
+    def __str__(self):
+        return f"{self.tg_file_id} @ {self.bot_id}"
+
+
+class ExtractedText(models.Model):
+    """
+    Tika ajratgan matn, fayl mazmunining SHA-256 bo'yicha (zlib bilan siqilgan).
+    Qayta indekslashda o'zgarmagan fayl Tika'ga qayta yuborilmaydi; bir xil
+    fayl bir necha marta yuklangan bo'lsa ham matn bir marta ajratiladi.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Ajratilgan matn")
+        verbose_name_plural = _("Ajratilgan matnlar")
+
+    def __str__(self):
+        return self.sha256
+
+    @property
+    def text(self) -> str:
+        return zlib.decompress(bytes(self.data)).decode()
+
+    @classmethod
+    def store(cls, sha256: str, text: str) -> None:
+        cls.objects.update_or_create(sha256=sha256, defaults={'data': zlib.compress(text.encode())})
+
+
 # models.py
 
 class InvitedUser(models.Model):
@@ -0,0 +1,28 @@
+# redis_client.py
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+
+_sync_client: redis.Redis | None = None
+_async_client: aioredis.Redis | None = None
+
+
+def connection_kwargs() -> dict:
+    return {"host": settings.REDIS_HOST, "port": settings.REDIS_PORT, "db": settings.REDIS_DB}
+
+
+def get_redis() -> redis.Redis:
+    """Jarayon bo'yicha umumiy sinxron Redis klienti (o'z ulanishlar havzasi bilan)."""
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = redis.Redis(**connection_kwargs())
+    return _sync_client
+
+
+def get_async_redis() -> aioredis.Redis:
+    """Jarayon bo'yicha umumiy asinxron Redis klienti."""
+    global _async_client
+    if _async_client is None:
+        _async_client = aioredis.Redis(**connection_kwargs())
+    return _async_client
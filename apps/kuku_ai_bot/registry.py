@@ -0,0 +1,150 @@
+# registry.py
+
+import asyncio
+import logging
+
+import redis
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+
+from .models import Bot
+from .redis_client import connection_kwargs, get_redis
+
+logger = logging.getLogger(__name__)
+
+# Barcha uvicorn worker'lariga o'zgarishlarni yetkazish uchun Redis kanali
+REGISTRY_CHANNEL = "kuku_ai_bot:bot_registry"
+
+# token -> Bot. Webhook har bir update uchun bazaga murojaat qilmasligi uchun
+# botlar worker xotirasida saqlanadi.
+_bots_by_token: dict[str, Bot] = {}
+_loaded = False
+_load_lock = asyncio.Lock()
+_listener_task: asyncio.Task | None = None
+# Pub/sub orqali bot o'zgarganda chaqiriladigan funksiyalar (masalan, stream consumer'larini qo'shish)
+_change_callbacks: list = []
+
+
+def load() -> None:
+    """Barcha botlarni bazadan o'qib, registrni to'liq qayta quradi."""
+    global _bots_by_token, _loaded
+    _bots_by_token = {bot.token: bot for bot in Bot.objects.all()}
+    _loaded = True
+    logger.info(f"Bot registry loaded: {len(_bots_by_token)} bot(s)")
+
+
+async def aload() -> None:
+    async with _load_lock:
+        if not _loaded:
+            await sync_to_async(load)()
+
+
+def all_bots() -> list[Bot]:
+    return list(_bots_by_token.values())
+
+
+def get(token: str) -> Bot | None:
+    return _bots_by_token.get(token)
+
+
+async def aget(token: str) -> Bot | None:
+    """
+    Token bo'yicha botni qaytaradi. Registr birinchi murojaatda yuklanadi,
+    keyingi chaqiruvlar bazaga ham, thread pool'ga ham tegmaydi.
+    """
+    if not _loaded:
+        await aload()
+        start_listener()
+    return _bots_by_token.get(token)
+
+
+def forget(bot_id: int) -> None:
+    for token, bot in list(_bots_by_token.items()):
+        if bot.pk == bot_id:
+            del _bots_by_token[token]
+
+
+def put(bot: Bot) -> None:
+    forget(bot.pk)
+    _bots_by_token[bot.token] = bot
+
+
+def refresh(bot_id: int) -> None:
+    """Bitta botni bazadan qayta o'qiydi (token o'zgargan yoki bot o'chirilgan bo'lishi mumkin)."""
+    bot = Bot.objects.filter(pk=bot_id).first()
+    if bot is None:
+        forget(bot_id)
+    else:
+        put(bot)
+
+
+def on_change(callback) -> None:
+    """
+    `callback(bot_id)` — boshqa jarayonda bot qo'shilgan, o'zgargan yoki o'chirilganda
+    (registr yangilangandan keyin). Qayta ulanishdan keyin registr to'liq qayta
+    yuklanadi va `bot_id` — None.
+    """
+    _change_callbacks.append(callback)
+
+
+def publish_change(bot_id: int) -> None:
+    """Boshqa worker'larga bot o'zgarganini xabar qiladi."""
+    try:
+        get_redis().publish(REGISTRY_CHANNEL, str(bot_id))
+    except redis.RedisError as e:
+        logger.warning(f"Bot registry invalidation could not be published: {e}")
+
+
+async def _listen() -> None:
+    reconnected = False
+    while True:
+        client = aioredis.Redis(**connection_kwargs())
+        try:
+            async with client.pubsub() as pubsub:
+                await pubsub.subscribe(REGISTRY_CHANNEL)
+                if reconnected:
+                    # Uzilish paytida e'lon qilingan o'zgarishlar pub/sub'da qayta kelmaydi
+                    await sync_to_async(load)()
+                    _notify(None)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        bot_id = int(message["data"])
+                        await sync_to_async(refresh)(bot_id)
+                    except Exception:
+                        # Bitta xabar (masalan, DatabaseError) tinglovchini to'xtatib qo'ymasligi kerak
+                        logger.exception(f"Bot registry refresh failed for message {message['data']!r}")
+                        continue
+                    _notify(bot_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Bot registry listener error, reconnecting: {e}")
+            reconnected = True
+            await asyncio.sleep(5)
+        finally:
+            await client.aclose()
+
+
+def _notify(bot_id: int | None) -> None:
+    for callback in _change_callbacks:
+        callback(bot_id)
+
+
+def start_listener() -> None:
+    """Joriy event loop'da Redis pub/sub tinglovchisini (bir marta) ishga tushiradi."""
+    global _listener_task
+    if _listener_task is None or _listener_task.done():
+        _listener_task = asyncio.get_running_loop().create_task(_listen())
+
+
+async def stop_listener() -> None:
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
@@ -0,0 +1,99 @@
+# scheduler.py
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+from django.conf import settings
+from telegram import Update
+from telegram.ext import Application
+
+from .metrics import (UPDATE_LANE_DEPTH, UPDATE_LANE_WAIT, UPDATE_LANES_ACTIVE,
+                      UPDATE_PROCESSING_TIME)
+
+logger = logging.getLogger(__name__)
+
+
+def lane_key(application: Application, update: Update) -> tuple:
+    """
+    Update qaysi "lane"ga tushishini aniqlaydi: bitta chat'ning update'lari
+    bitta lane'da ketma-ket bajariladi. Chat'i yo'q update'lar (masalan,
+    inline query) foydalanuvchi bo'yicha, u ham bo'lmasa alohida lane oladi.
+    """
+    if update.effective_chat:
+        return application.bot.token, "chat", update.effective_chat.id
+    if update.effective_user:
+        return application.bot.token, "user", update.effective_user.id
+    return application.bot.token, "update", update.update_id
+
+
+class ChatLaneScheduler:
+    """
+    Per-chat tartiblangan, chat'lar orasida parallel dispatcher.
+
+    Bir chat'dan kelgan update'lar kelish tartibida, bittadan bajariladi
+    (masalan, pagination callback qidiruv sessiyasi saqlanishidan oldin
+    ishlab ketmaydi). Turli chat'lar parallel ishlaydi, lekin bir vaqtda
+    `max_concurrency` tadan ko'p emas. Tartib faqat bitta jarayon ichida
+    kafolatlanadi.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._lanes: dict[tuple, deque] = {}
+        self._semaphore: asyncio.Semaphore | None = None
+        self._drainers: set[asyncio.Task] = set()
+
+    def submit(self, application: Application, update: Update) -> asyncio.Future:
+        """
+        Update'ni o'z lane'iga qo'yadi va kutmasdan qaytadi. Bajarilishi va
+        xatolari lane'ning drain task'ida kuzatiladi (xato log'ga yoziladi);
+        qaytgan future update qayta ishlanganda yakunlanadi.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        future = asyncio.get_running_loop().create_future()
+        key = lane_key(application, update)
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = deque()
+            task = asyncio.create_task(self._drain(key, lane))
+            self._drainers.add(task)
+            task.add_done_callback(self._drainers.discard)
+            UPDATE_LANES_ACTIVE.set(len(self._lanes))
+        lane.append((application, update, time.monotonic(), future))
+        UPDATE_LANE_DEPTH.observe(len(lane))
+        return future
+
+    async def run(self, application: Application, update: Update) -> None:
+        """Update'ni o'z lane'iga qo'yadi va u qayta ishlanguncha kutadi."""
+        await self.submit(application, update)
+
+    async def _drain(self, key: tuple, lane: deque) -> None:
+        try:
+            while lane:
+                application, update, enqueued_at, future = lane[0]
+                async with self._semaphore:
+                    UPDATE_LANE_WAIT.observe(time.monotonic() - enqueued_at)
+                    try:
+                        with UPDATE_PROCESSING_TIME.time():
+                            await application.process_update(update)
+                    except Exception as e:
+                        logger.exception(f"Failed to process update {update.update_id}")
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        if not future.done():
+                            future.set_result(None)
+                lane.popleft()
+        finally:
+            # Bekor qilingan (shutdown) lane'dagi kutayotganlarni ham bo'shatamiz
+            for _, _, _, future in lane:
+                if not future.done():
+                    future.cancel()
+            del self._lanes[key]
+            UPDATE_LANES_ACTIVE.set(len(self._lanes))
+
+
+lane_scheduler = ChatLaneScheduler(max_concurrency=settings.BOT_UPDATE_CONCURRENCY)
@@ -0,0 +1,399 @@
+# search.py
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from elasticsearch import AsyncElasticsearch
+from elasticsearch_dsl import Q, Search
+
+from .documents import TgFileDocument
+from .metrics import SEARCH_TIER_ANSWERS
+from .search_cache import entry_key, search_cache
+
+PAGE_SIZE = 10
+# Natijalar sahifasini chizish uchun _source'dan olinadigan maydonlar
+DISPLAY_FIELDS = ['title', 'file_type', 'size_in_bytes', 'subcategory.name']
+# Jami natijalar soni shu chegaragacha aniq sanaladi, undan keyin "10 000+" ko'rsatiladi.
+# (Bu from/size bilan ochish mumkin bo'lgan max_result_window bilan ham mos.)
+TRACK_TOTAL_HITS_LIMIT = 10000
+# Har bir facet bo'yicha ko'rsatiladigan qiymatlar soni
+FACET_SIZE = 10
+# Deep qidiruv parchalaridagi topilgan so'zlar belgilari (xabarda <b> ga aylantiriladi)
+HIGHLIGHT_PRE, HIGHLIGHT_POST = '\ue000', '\ue001'
+HIGHLIGHT_FIELDS = ['content', 'content.latn']
+
+_async_client: AsyncElasticsearch | None = None
+# Benchmark'lar servisni boshqa (sintetik) indeksga yo'naltirishi uchun
+_index_override: ContextVar[str | None] = ContextVar('search_index_override', default=None)
+
+
+def index_name() -> str:
+    return _index_override.get() or TgFileDocument._index._name
+
+
+@contextmanager
+def use_index(name: str):
+    """Blok ichida qidiruv servisi `name` indeksidan foydalanadi (joriy task/thread uchun)."""
+    token = _index_override.set(name)
+    try:
+        yield
+    finally:
+        _index_override.reset(token)
+
+
+def get_async_client() -> AsyncElasticsearch:
+    """
+    Jarayon bo'yicha umumiy AsyncElasticsearch klienti (o'z ulanishlar havzasi,
+    timeout va retry sozlamalari bilan). Async handler'lar sinxron elasticsearch-dsl
+    so'rovlari bilan event loop'ni to'xtatib qo'ymasligi uchun.
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncElasticsearch(
+            settings.ELASTICSEARCH_DSL['default']['hosts'],
+            connections_per_node=settings.ES_CONNECTIONS_PER_NODE,
+            request_timeout=settings.ES_REQUEST_TIMEOUT,
+            max_retries=settings.ES_MAX_RETRIES,
+            retry_on_timeout=True,
+        )
+    return _async_client
+
+
+async def close_async_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+# To'liq so'z bo'yicha moslik (stemming va kirill/lotin `.latn` subfield'lari bilan)
+NORMAL_FIELDS = [
+    'title^5', 'title.latn^4', 'file_name^4', 'file_name.latn^3',
+    'description^1', 'description.latn^1', 'description.ru^1', 'description.tr^1',
+]
+DEEP_FIELDS = NORMAL_FIELDS + ['content^3', 'content.latn^2', 'content.ru^2', 'content.tr^2']
+
+# So'z boshi (edge n-gram) bo'yicha moslik: "matem" -> "matematika"
+PREFIX_FIELDS = ['title.prefix^3', 'file_name.prefix^2']
+
+
+# Natija topilmasa navbatdagi "tier" sinab ko'riladi (birinchisi — rejimning asosiy so'rovi)
+SEARCH_TIERS = {
+    'normal': ['exact', 'fuzzy', 'deep'],
+    'deep': ['exact', 'fuzzy'],
+}
+
+
+def build_search_query(text: str, search_mode: str, tier: str = 'exact'):
+    """
+    Bot va sayt qidiruvi uchun umumiy multi_match so'rovi.
+
+    Avvalgi `QueryString(query=f"*{text}*")` leading wildcard tufayli har bir
+    so'rovda butun term lug'atini aylanib chiqardi. Endi barcha so'zlar to'liq
+    (stemming bilan) yoki so'z boshi sifatida indeksdagi tayyor tokenlarga mos keladi.
+
+    `tier`: exact — to'liq so'z/prefix; fuzzy — imlo xatolariga chidamli;
+    deep — oddiy rejimda ham fayl ichidan (`content`) qidirish.
+    """
+    if tier == 'deep':
+        search_mode = 'deep'
+    fields = DEEP_FIELDS if search_mode == 'deep' else NORMAL_FIELDS
+    if tier == 'fuzzy':
+        # cross_fields fuzziness'ni qo'llamaydi: har bir so'z istalgan maydonda (imlo xatosi bilan) bo'lishi kerak
+        terms = text.split()
+        if not terms:
+            return Q('match_none')
+        return Q('bool', must=[
+            Q('multi_match', query=term, fields=fields, fuzziness='AUTO', prefix_length=1)
+            for term in terms
+        ])
+    # cross_fields: so'zlar turli maydonlarda bo'lishi mumkin (biri sarlavhada, biri tavsifda),
+    # `and` — har bir so'z bir xil analyzer'li maydonlar guruhining birortasida
+    return Q(
+        'bool',
+        should=[
+            Q('multi_match', query=text, fields=fields, type='cross_fields', operator='and'),
+            Q('multi_match', query=text, fields=PREFIX_FIELDS, type='cross_fields', operator='and'),
+        ],
+        minimum_should_match=1,
+    )
+
+
+# Inline rejim: yozilayotgan so'rov (oxirgi so'z — prefix) bo'yicha search-as-you-type
+SUGGEST_FIELDS = [
+    'title.suggest^3', 'title.suggest._2gram^3', 'title.suggest._3gram^3',
+    'file_name.suggest', 'file_name.suggest._2gram', 'file_name.suggest._3gram',
+]
+
+
+def build_suggest_query(text: str):
+    return Q('multi_match', query=text, fields=SUGGEST_FIELDS, type='bool_prefix', operator='and')
+
+
+@dataclass
+class FileHit:
+    """
+    Natijalar sahifasidagi bitta fayl (ES _source'idan). Klaviatura uchun
+    TgFile o'rniga ishlatiladi: `id` va `title` atributlari bir xil.
+    """
+    id: int
+    title: str
+    file_type: str
+    size_in_bytes: int
+    subcategory: str | None = None
+    # Deep qidiruvda fayl ichidagi mos parcha (HIGHLIGHT_PRE/POST belgilari bilan)
+    snippet: str | None = None
+
+    @classmethod
+    def from_es(cls, hit: dict) -> "FileHit":
+        source = hit.get('_source') or {}
+        highlight = hit.get('highlight') or {}
+        fragments = next((highlight[field] for field in HIGHLIGHT_FIELDS if highlight.get(field)), None)
+        return cls(
+            id=int(hit['_id']),
+            title=source.get('title') or '',
+            file_type=source.get('file_type') or 'other',
+            size_in_bytes=source.get('size_in_bytes') or 0,
+            subcategory=(source.get('subcategory') or {}).get('name'),
+            snippet=fragments[0] if fragments else None,
+        )
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class SearchPage:
+    """Bitta Elasticsearch so'rovidan olingan sahifa: score bo'yicha tartiblangan hit'lar va jami son."""
+    hits: list[FileHit]
+    total: int
+    total_is_exact: bool
+    number: int
+    page_size: int = PAGE_SIZE
+    # facet nomi -> [{"value", "label", "count"}, ...] (faqat with_facets=True bo'lganda)
+    facets: dict | None = None
+
+    @property
+    def display_total(self) -> str:
+        if self.total_is_exact:
+            return str(self.total)
+        return f"{self.total:,}+".replace(",", " ")
+
+    @property
+    def ids(self) -> list[int]:
+        return [hit.id for hit in self.hits]
+
+    def as_page(self) -> Page:
+        """Klaviatura uchun Django Page obyekti (object_list — FileHit'lar)."""
+        return Page(self.hits, self.number, Paginator(range(self.total), self.page_size))
+
+    def to_cache(self) -> dict:
+        return {
+            'hits': [hit.to_dict() for hit in self.hits],
+            'total': self.total,
+            'total_is_exact': self.total_is_exact,
+            'facets': self.facets,
+        }
+
+
+def build_filters(filters: dict | None) -> list:
+    """
+    Facet filtrlari (file_type, subcategory, category) — filter context'da, shuning
+    uchun score'ga ta'sir qilmaydi va Elasticsearch ularni query cache'da saqlaydi.
+    """
+    clauses = []
+    if not filters:
+        return clauses
+    if filters.get('file_type'):
+        clauses.append(Q('term', file_type=filters['file_type']))
+    if filters.get('subcategory'):
+        clauses.append(Q('term', **{'subcategory.id': int(filters['subcategory'])}))
+    if filters.get('category'):
+        clauses.append(Q('term', **{'category.id': int(filters['category'])}))
+    return clauses
+
+
+def filtered_query(text: str, search_mode: str, tier: str = 'exact', filters: dict | None = None):
+    query = build_search_query(text, search_mode, tier)
+    clauses = build_filters(filters)
+    if not clauses:
+        return query
+    return Q('bool', must=[query], filter=clauses)
+
+
+def add_highlight(s: Search, search_mode: str, tier: str = 'exact') -> Search:
+    """
+    Fayl ichidan qidirilganda (deep) har bir hit uchun `content` dan bitta qisqa
+    parcha. Unified highlighter mapping'dagi offset'lardan foydalanadi.
+    """
+    if search_mode != 'deep' and tier != 'deep':
+        return s
+    return s.highlight_options(
+        type='unified',
+        fragment_size=settings.SEARCH_SNIPPET_SIZE,
+        number_of_fragments=1,
+        no_match_size=0,
+        pre_tags=[HIGHLIGHT_PRE],
+        post_tags=[HIGHLIGHT_POST],
+    ).highlight(*HIGHLIGHT_FIELDS)
+
+
+def add_facet_aggs(s: Search) -> Search:
+    s.aggs.bucket('file_type', 'terms', field='file_type', size=FACET_SIZE)
+    # ID bo'yicha guruhlanadi (filtr qiymati), nomi — ichki terms'dan
+    s.aggs.bucket('subcategory', 'terms', field='subcategory.id', size=FACET_SIZE) \
+        .bucket('name', 'terms', field='subcategory.name', size=1)
+    s.aggs.bucket('category', 'terms', field='category.id', size=FACET_SIZE) \
+        .bucket('name', 'terms', field='category.name', size=1)
+    return s
+
+
+def facets_from_aggs(aggregations: dict) -> dict:
+    facets = {}
+    for name, agg in aggregations.items():
+        facets[name] = [
+            {
+                'value': bucket['key'],
+                'label': bucket['name']['buckets'][0]['key'] if bucket.get('name', {}).get('buckets') else str(bucket['key']),
+                'count': bucket['doc_count'],
+            }
+            for bucket in agg['buckets']
+        ]
+    return facets
+
+
+def facet_counts(query=None, filters: dict | None = None) -> dict:
+    """
+    Sayt uchun facet sonlari. `size=0` so'rovi — Elasticsearch shard request
+    cache'ida keshlanadi (indeks yangilanguncha).
+    """
+    s = TgFileDocument.search(index=index_name()).extra(size=0)
+    if query is not None:
+        s = s.query(query)
+    for clause in build_filters(filters):
+        s = s.filter(clause)
+    response = add_facet_aggs(s).execute()
+    return facets_from_aggs(response.aggregations.to_dict())
+
+
+def _page_search(text: str, search_mode: str, page_number: int, page_size: int, tier: str = 'exact',
+                 filters: dict | None = None, with_facets: bool = False) -> Search:
+    start = (page_number - 1) * page_size
+    s = (
+        TgFileDocument.search(index=index_name())
+        .query(filtered_query(text, search_mode, tier, filters))
+        .extra(track_total_hits=TRACK_TOTAL_HITS_LIMIT)
+        .source(DISPLAY_FIELDS)
+    )
+    s = add_highlight(s, search_mode, tier)
+    if with_facets:
+        s = add_facet_aggs(s)
+    return s[start:start + page_size]
+
+
+def _page_from_response(response: dict, page_number: int, page_size: int) -> SearchPage:
+    hits = response['hits']
+    return SearchPage(
+        hits=[FileHit.from_es(hit) for hit in hits['hits']],
+        total=hits['total']['value'],
+        total_is_exact=hits['total']['relation'] == 'eq',
+        number=page_number,
+        page_size=page_size,
+        facets=facets_from_aggs(response['aggregations']) if 'aggregations' in response else None,
+    )
+
+
+def _page_from_cache(entry: dict, page_number: int, page_size: int) -> SearchPage:
+    return SearchPage(
+        hits=[FileHit(**hit) for hit in entry['hits']],
+        total=entry['total'],
+        total_is_exact=entry['total_is_exact'],
+        number=page_number,
+        page_size=page_size,
+        facets=entry.get('facets'),
+    )
+
+
+def search_files(text: str, search_mode: str, page_number: int = 1, page_size: int = PAGE_SIZE,
+                 tier: str = 'exact', filters: dict | None = None, with_facets: bool = False) -> SearchPage:
+    """
+    Bot qidiruvining umumiy servisi. Avval `count()` + `execute()` — ikkita
+    so'rov edi; endi jami son `track_total_hits` orqali sahifa so'rovining
+    o'zidan olinadi. `_source` dan faqat sahifani chizish uchun kerakli maydonlar.
+    Natija Redis'da keshlanadi (`search_cache`), facet'lar ham birga.
+    Sinxron kod (sayt view'lari, management buyruqlari) uchun.
+    """
+    key = entry_key(index_name(), text, search_mode, tier, page_number, page_size, filters, with_facets)
+    generation, entry = search_cache.get(key)
+    if entry is not None:
+        return _page_from_cache(entry, page_number, page_size)
+    response = _page_search(text, search_mode, page_number, page_size, tier, filters, with_facets).execute()
+    page = _page_from_response(response.to_dict(), page_number, page_size)
+    search_cache.set(key, generation, page.to_cache())
+    return page
+
+
+async def asearch_files(text: str, search_mode: str, page_number: int = 1, page_size: int = PAGE_SIZE,
+                        tier: str = 'exact', filters: dict | None = None, with_facets: bool = False) -> SearchPage:
+    """search_files'ning async varianti: event loop'ni bloklamaydi (bot handler'lari uchun)."""
+    key = entry_key(index_name(), text, search_mode, tier, page_number, page_size, filters, with_facets)
+    generation, entry = await search_cache.aget(key)
+    if entry is not None:
+        return _page_from_cache(entry, page_number, page_size)
+    s = _page_search(text, search_mode, page_number, page_size, tier, filters, with_facets)
+    response = await get_async_client().search(index=index_name(), body=s.to_dict())
+    page = _page_from_response(response.body, page_number, page_size)
+    await search_cache.aset(key, generation, page.to_cache())
+    return page
+
+
+async def asearch_cascade(text: str, search_mode: str, page_size: int = PAGE_SIZE, filters: dict | None = None,
+                          with_facets: bool = False) -> tuple[str | None, SearchPage]:
+    """
+    Natija topilguncha tier'larni ketma-ket sinaydi: exact -> fuzzy -> deep.
+
+    Birinchi tier har doim bajariladi; keyingilari faqat umumiy
+    `SEARCH_FALLBACK_BUDGET_MS` vaqt qolgan bo'lsa va shu vaqt ichida.
+    Natija bergan tier (yoki hech biri bo'lmasa None) va sahifa qaytariladi.
+    """
+    started = time.monotonic()
+    budget = settings.SEARCH_FALLBACK_BUDGET_MS / 1000
+    page = None
+    for index, tier in enumerate(SEARCH_TIERS[search_mode]):
+        search = asearch_files(text, search_mode, page_size=page_size, tier=tier, filters=filters,
+                               with_facets=with_facets)
+        if index == 0:
+            page = await search
+        else:
+            remaining = budget - (time.monotonic() - started)
+            if remaining <= 0:
+                search.close()
+                break
+            try:
+                page = await asyncio.wait_for(search, remaining)
+            except asyncio.TimeoutError:
+                break
+        if page.total:
+            SEARCH_TIER_ANSWERS.labels(tier=tier).inc()
+            return tier, page
+    SEARCH_TIER_ANSWERS.labels(tier="none").inc()
+    return None, page
+
+
+async def asuggest_files(text: str, offset: int, limit: int) -> list[FileHit]:
+    """
+    Inline rejim uchun: `offset` dan boshlab `limit` ta hit. Jami son hisoblanmaydi
+    (keyingi sahifa bor-yo'qligi hit'lar soni bo'yicha aniqlanadi).
+    """
+    s = (
+        TgFileDocument.search(index=index_name())
+        .query(build_suggest_query(text))
+        .extra(track_total_hits=False)
+        .source(DISPLAY_FIELDS)
+    )[offset:offset + limit]
+    response = await get_async_client().search(index=index_name(), body=s.to_dict())
+    return [FileHit.from_es(hit) for hit in response.body['hits']['hits']]
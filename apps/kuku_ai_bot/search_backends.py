@@ -0,0 +1,382 @@
+# search_backends.py
+
+import asyncio
+import logging
+import re
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from elasticsearch import ApiError, TransportError
+
+from .metrics import SEARCH_BACKEND_REQUESTS, SEARCH_BREAKER_OPEN, SEARCH_TIER_ANSWERS
+from .models import SubCategory, TgFile
+from .search import (PAGE_SIZE, FileHit, SearchPage, asearch_cascade, asearch_files, asuggest_files,
+                     search_files)
+
+logger = logging.getLogger(__name__)
+
+# Elasticsearch'ning "ishlamayapti" deb hisoblanadigan xatolari (ulanish, timeout, 5xx, indeks yo'q)
+PRIMARY_ERRORS = (ApiError, TransportError, asyncio.TimeoutError)
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+class SearchBackend:
+    """
+    Bot qidiruvi backend'i. `search` — birinchi sahifa va natija bergan tier
+    (natija bo'lmasa None), `page` — sessiyadagi keyingi sahifalar.
+    """
+    name = ''
+
+    async def search(self, text: str, search_mode: str, page_size: int = PAGE_SIZE,
+                     filters: dict | None = None, with_facets: bool = False) -> tuple[str | None, SearchPage]:
+        raise NotImplementedError
+
+    async def page(self, text: str, search_mode: str, page_number: int, page_size: int = PAGE_SIZE,
+                   tier: str | None = None, filters: dict | None = None) -> SearchPage:
+        raise NotImplementedError
+
+    async def suggest(self, text: str, offset: int, limit: int) -> list[FileHit]:
+        """Inline rejim: search-as-you-type hit'lari."""
+        raise NotImplementedError
+
+    def page_sync(self, text: str, search_mode: str, page_number: int, page_size: int = PAGE_SIZE,
+                  tiers: tuple = ('exact',), filters: dict | None = None, with_facets: bool = False) -> SearchPage:
+        """Sinxron kod (sayt view'lari) uchun sahifa: `tiers` natija topilguncha ketma-ket sinaladi."""
+        raise NotImplementedError
+
+
+class ElasticsearchBackend(SearchBackend):
+    name = 'elasticsearch'
+
+    async def search(self, text, search_mode, page_size=PAGE_SIZE, filters=None, with_facets=False):
+        return await asearch_cascade(text, search_mode, page_size=page_size, filters=filters, with_facets=with_facets)
+
+    async def page(self, text, search_mode, page_number, page_size=PAGE_SIZE, tier=None, filters=None):
+        return await asearch_files(text, search_mode, page_number=page_number, page_size=page_size,
+                                   tier=tier or 'exact', filters=filters)
+
+    async def suggest(self, text, offset, limit):
+        return await asuggest_files(text, offset, limit)
+
+    def page_sync(self, text, search_mode, page_number, page_size=PAGE_SIZE, tiers=('exact',), filters=None,
+                  with_facets=False):
+        for tier in tiers:
+            page = search_files(text, search_mode, page_number, page_size, tier=tier, filters=filters,
+                                with_facets=with_facets)
+            if page.total:
+                break
+        return page
+
+
+class DatabaseBackend(SearchBackend):
+    """
+    Bazadagi full-text qidiruv: `title`, `file_name`, `description` va deep
+    rejimda `content_text` bo'yicha, har bir so'z prefix sifatida. Elasticsearch
+    ishlamaganda (yoki `SEARCH_BACKEND=database`) ishlatiladi. Fuzzy tier,
+    transliteratsiya va facet'lar yo'q; tier — doim "database".
+    """
+    name = 'database'
+    tier = 'database'
+
+    def match_sql(self, search_mode: str, tokens: list[str]) -> tuple[str, str, str, list]:
+        """(FROM qismi, WHERE sharti, ORDER BY, parametrlar). Parametrlar — WHERE keyin ORDER BY tartibida."""
+        raise NotImplementedError
+
+    async def search(self, text, search_mode, page_size=PAGE_SIZE, filters=None, with_facets=False):
+        page = await self.page(text, search_mode, 1, page_size=page_size, filters=filters)
+        tier = self.tier if page.total else None
+        SEARCH_TIER_ANSWERS.labels(tier=tier or "none").inc()
+        return tier, page
+
+    async def page(self, text, search_mode, page_number, page_size=PAGE_SIZE, tier=None, filters=None):
+        return await sync_to_async(self._page)(text, search_mode, page_number, page_size, filters)
+
+    async def suggest(self, text, offset, limit):
+        # Search-as-you-type faqat Elasticsearch'da: bazadan inline natijalar berilmaydi
+        return []
+
+    def page_sync(self, text, search_mode, page_number, page_size=PAGE_SIZE, tiers=('exact',), filters=None,
+                  with_facets=False):
+        return self._page(text, search_mode, page_number, page_size, filters)
+
+    def _page(self, text: str, search_mode: str, page_number: int, page_size: int,
+              filters: dict | None) -> SearchPage:
+        tokens = TOKEN_RE.findall(text.lower())
+        if not tokens:
+            return SearchPage(hits=[], total=0, total_is_exact=True, number=page_number, page_size=page_size)
+        source, where, order_by, params = self.match_sql(search_mode, tokens)
+        filter_sql, filter_params = self.filter_sql(filters)
+        # Parametrlar SQL'dagi tartibda: filtrlar, match sharti, ORDER BY, LIMIT/OFFSET
+        sql = (
+            f"SELECT f.id, f.title, f.file_type, f.size_in_bytes, s.name, COUNT(*) OVER () "
+            f"FROM {source} "
+            f"LEFT JOIN {SubCategory._meta.db_table} s ON s.id = f.subcategory_id "
+            f"WHERE TRUE{filter_sql} AND {where} "
+            f"ORDER BY {order_by}, f.id DESC LIMIT %s OFFSET %s"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, filter_params + params + [page_size, (page_number - 1) * page_size])
+            rows = cursor.fetchall()
+        return SearchPage(
+            hits=[
+                FileHit(id=row[0], title=row[1] or '', file_type=row[2] or 'other',
+                        size_in_bytes=row[3] or 0, subcategory=row[4])
+                for row in rows
+            ],
+            total=rows[0][5] if rows else 0,
+            total_is_exact=True,
+            number=page_number,
+            page_size=page_size,
+        )
+
+    @staticmethod
+    def filter_sql(filters: dict | None) -> tuple[str, list]:
+        clauses, params = [], []
+        if not filters:
+            return '', params
+        if filters.get('file_type'):
+            clauses.append("f.file_type = %s")
+            params.append(filters['file_type'])
+        if filters.get('subcategory'):
+            clauses.append("f.subcategory_id = %s")
+            params.append(int(filters['subcategory']))
+        if filters.get('category'):
+            clauses.append("s.category_id = %s")
+            params.append(int(filters['category']))
+        return ''.join(f" AND {clause}" for clause in clauses), params
+
+
+class PostgresBackend(DatabaseBackend):
+    """`to_tsvector('simple', ...)` + GIN indekslari (0006 migratsiyasi, ifodalar bir xil)."""
+
+    NORMAL_VECTOR = ("to_tsvector('simple', coalesce(f.title, '') || ' ' || coalesce(f.file_name, '') "
+                     "|| ' ' || coalesce(f.description, ''))")
+    DEEP_VECTOR = ("to_tsvector('simple', coalesce(f.title, '') || ' ' || coalesce(f.file_name, '') "
+                   "|| ' ' || coalesce(f.description, '') || ' ' || coalesce(f.content_text, ''))")
+
+    def match_sql(self, search_mode, tokens):
+        vector = self.DEEP_VECTOR if search_mode == 'deep' else self.NORMAL_VECTOR
+        # Tokenlar faqat \w belgilaridan iborat — tsquery sintaksisiga xavfsiz
+        tsquery = ' & '.join(f"{token}:*" for token in tokens)
+        return (
+            f"{TgFile._meta.db_table} f",
+            f"{vector} @@ to_tsquery('simple', %s)",
+            f"ts_rank({vector}, to_tsquery('simple', %s)) DESC",
+            [tsquery, tsquery],
+        )
+
+
+class SqliteBackend(DatabaseBackend):
+    """DEBUG (SQLite): TgFile'ga bog'langan FTS5 jadvali (0006 migratsiyasi), bm25 (`rank`) bo'yicha tartib."""
+
+    FTS_TABLE = 'kuku_ai_bot_tgfile_fts'
+    NORMAL_COLUMNS = '{title file_name description}'
+    DEEP_COLUMNS = '{title file_name description content_text}'
+
+    def __init__(self):
+        self._rebuilt = False
+
+    def match_sql(self, search_mode, tokens):
+        columns = self.DEEP_COLUMNS if search_mode == 'deep' else self.NORMAL_COLUMNS
+        match = f"{columns} : (" + ' AND '.join(f'"{token}"*' for token in tokens) + ")"
+        return (
+            f"{self.FTS_TABLE} JOIN {TgFile._meta.db_table} f ON f.id = {self.FTS_TABLE}.rowid",
+            f"{self.FTS_TABLE} MATCH %s",
+            # bm25() oyna funksiyasi (COUNT OVER) bilan ishlamaydi; `rank` — migratsiyada sozlangan bm25
+            f"{self.FTS_TABLE}.rank",
+            [match],
+        )
+
+    def _page(self, text, search_mode, page_number, page_size, filters):
+        if not self._rebuilt:
+            # SQLite jadvalni qayta yaratadigan migratsiyalar trigger'larni o'chirib yuboradi;
+            # dev bazasi kichik, shuning uchun jarayon boshida FTS jadvali qayta quriladi.
+            with connection.cursor() as cursor:
+                cursor.execute(f"INSERT INTO {self.FTS_TABLE}({self.FTS_TABLE}) VALUES ('rebuild')")
+            self._rebuilt = True
+        return super()._page(text, search_mode, page_number, page_size, filters)
+
+
+class CircuitBreaker:
+    """
+    Elasticsearch uchun circuit breaker (jarayon ichida). Ketma-ket `failure_threshold`
+    ta xato (yoki `latency_budget` dan sekin javob) bo'lsa ochiladi va so'rovlar
+    zaxira backend'ga boradi. `reset_timeout` o'tgach bitta so'rov Elasticsearch'ga
+    sinov sifatida yuboriladi: muvaffaqiyatli bo'lsa yopiladi, aks holda yana ochiladi.
+    """
+
+    def __init__(self, failure_threshold: int, latency_budget: float, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.latency_budget = latency_budget
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow_request(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if self._probing or time.monotonic() - self._opened_at < self.reset_timeout:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self, elapsed: float) -> None:
+        if elapsed > self.latency_budget:
+            self.record_failure()
+            return
+        if self._opened_at is not None:
+            logger.info("Search circuit breaker closed, Elasticsearch is back")
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        SEARCH_BREAKER_OPEN.set(0)
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or self._failures >= self.failure_threshold:
+            if not self._probing:
+                logger.warning(f"Search circuit breaker opened after {self._failures} failures")
+            self._opened_at = time.monotonic()
+            self._probing = False
+            SEARCH_BREAKER_OPEN.set(1)
+
+    def abort_probe(self) -> None:
+        """Sinov so'rovi kutilmagan xato bilan (yoki bekor qilinib) tugadi — breaker yana ochiladi."""
+        if self._probing:
+            self.record_failure()
+
+
+class FailoverBackend(SearchBackend):
+    """Asosiy backend (Elasticsearch) circuit breaker orqali; ochiq bo'lsa yoki xato bersa — zaxira."""
+
+    def __init__(self, primary: SearchBackend, fallback: SearchBackend | None, breaker: CircuitBreaker):
+        self.primary = primary
+        self.fallback = fallback
+        self.breaker = breaker
+        self.name = primary.name
+
+    def _primary_failed(self, e: Exception, fallback_call) -> None:
+        self.breaker.record_failure()
+        SEARCH_BACKEND_REQUESTS.labels(backend=self.primary.name, result="error").inc()
+        if fallback_call is not None:
+            logger.warning(f"Search backend {self.primary.name} failed ({type(e).__name__}), using {self.fallback.name}")
+
+    def _primary_succeeded(self, started: float) -> None:
+        elapsed = time.monotonic() - started
+        self.breaker.record_success(elapsed)
+        slow = elapsed > self.breaker.latency_budget
+        SEARCH_BACKEND_REQUESTS.labels(backend=self.primary.name, result="slow" if slow else "ok").inc()
+
+    async def _call(self, primary_call, fallback_call):
+        """`fallback_call` None bo'lsa Elasticsearch xatosi chaqiruvchiga ko'tariladi (breaker baribir hisoblaydi)."""
+        if self.fallback is None:
+            fallback_call = None
+        if fallback_call is None or self.breaker.allow_request():
+            started = time.monotonic()
+            try:
+                result = await primary_call()
+            except PRIMARY_ERRORS as e:
+                self._primary_failed(e, fallback_call)
+                if fallback_call is None:
+                    raise
+            except BaseException:
+                # Aks holda `_probing` True qolib, Elasticsearch boshqa hech qachon sinalmaydi
+                self.breaker.abort_probe()
+                raise
+            else:
+                self._primary_succeeded(started)
+                return result
+        result = await fallback_call()
+        SEARCH_BACKEND_REQUESTS.labels(backend=self.fallback.name, result="ok").inc()
+        return result
+
+    def _call_sync(self, primary_call, fallback_call):
+        """`_call` ning sinxron varianti (sayt view'lari), breaker umumiy."""
+        if self.fallback is None:
+            fallback_call = None
+        if fallback_call is None or self.breaker.allow_request():
+            started = time.monotonic()
+            try:
+                result = primary_call()
+            except PRIMARY_ERRORS as e:
+                self._primary_failed(e, fallback_call)
+                if fallback_call is None:
+                    raise
+            except BaseException:
+                self.breaker.abort_probe()
+                raise
+            else:
+                self._primary_succeeded(started)
+                return result
+        result = fallback_call()
+        SEARCH_BACKEND_REQUESTS.labels(backend=self.fallback.name, result="ok").inc()
+        return result
+
+    async def search(self, text, search_mode, page_size=PAGE_SIZE, filters=None, with_facets=False):
+        return await self._call(
+            lambda: self.primary.search(text, search_mode, page_size, filters, with_facets),
+            lambda: self.fallback.search(text, search_mode, page_size, filters, with_facets),
+        )
+
+    async def page(self, text, search_mode, page_number, page_size=PAGE_SIZE, tier=None, filters=None):
+        if self.fallback is not None and tier == self.fallback.tier:
+            return await self.fallback.page(text, search_mode, page_number, page_size, tier, filters)
+        return await self._call(
+            lambda: self.primary.page(text, search_mode, page_number, page_size, tier, filters),
+            lambda: self.fallback.page(text, search_mode, page_number, page_size, tier, filters),
+        )
+
+    async def suggest(self, text, offset, limit):
+        # Zaxira backend'da search-as-you-type yo'q: xato yashirilmaydi, inline handler bo'sh javob beradi
+        return await self._call(lambda: self.primary.suggest(text, offset, limit), None)
+
+    def page_sync(self, text, search_mode, page_number, page_size=PAGE_SIZE, tiers=('exact',), filters=None,
+                  with_facets=False):
+        return self._call_sync(
+            lambda: self.primary.page_sync(text, search_mode, page_number, page_size, tiers, filters, with_facets),
+            lambda: self.fallback.page_sync(text, search_mode, page_number, page_size, tiers, filters, with_facets),
+        )
+
+
+DATABASE_BACKENDS = {
+    'postgresql': PostgresBackend,
+    'sqlite': SqliteBackend,
+}
+
+_backend: SearchBackend | None = None
+
+
+def database_backend() -> DatabaseBackend | None:
+    backend_class = DATABASE_BACKENDS.get(connection.vendor)
+    return backend_class() if backend_class else None
+
+
+def get_backend() -> SearchBackend:
+    """
+    Jarayon bo'yicha bitta backend. `SEARCH_BACKEND=database` — Elasticsearch'siz
+    (kichik o'rnatishlar), aks holda Elasticsearch + circuit breaker + bazadagi zaxira.
+    """
+    global _backend
+    if _backend is None:
+        fallback = database_backend()
+        if settings.SEARCH_BACKEND == 'database':
+            if fallback is None:
+                raise ImproperlyConfigured(f"SEARCH_BACKEND=database is not supported on {connection.vendor}")
+            _backend = fallback
+        else:
+            breaker = CircuitBreaker(
+                failure_threshold=settings.SEARCH_BREAKER_FAILURES,
+                latency_budget=settings.SEARCH_BREAKER_LATENCY_MS / 1000,
+                reset_timeout=settings.SEARCH_BREAKER_RESET_SECONDS,
+            )
+            _backend = FailoverBackend(ElasticsearchBackend(), fallback, breaker)
+    return _backend
@@ -0,0 +1,143 @@
+# search_cache.py
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+
+import orjson
+import redis
+from django.conf import settings
+
+from .metrics import SEARCH_CACHE_REQUESTS
+from .redis_client import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "kuku_ai_bot:search:generation"
+ENTRY_KEY = "kuku_ai_bot:search:{index}:{mode}:{tier}:{page}:{page_size}:{digest}"
+
+
+def normalize_query(text: str) -> str:
+    """Kesh kaliti uchun: registr va ortiqcha bo'shliqlar natijaga ta'sir qilmaydi."""
+    return " ".join(text.lower().split())
+
+
+def entry_key(index: str, text: str, search_mode: str, tier: str, page_number: int, page_size: int,
+              filters: dict | None = None, with_facets: bool = False) -> str:
+    digest = hashlib.sha1(orjson.dumps(
+        [normalize_query(text), filters or {}, with_facets], option=orjson.OPT_SORT_KEYS
+    )).hexdigest()
+    return ENTRY_KEY.format(index=index, mode=search_mode, tier=tier, page=page_number, page_size=page_size, digest=digest)
+
+
+class SearchCache:
+    """
+    Qidiruv sahifalari uchun Redis kesh: `(so'rov, filtrlar, rejim, tier, sahifa)` -> tartiblangan
+    hit'lar (ID va ko'rsatiladigan maydonlar), jami son va facet'lar.
+
+    Har bir yozuv indeksning "generation" raqami bilan saqlanadi. TgFile
+    o'zgarganda generation oshiriladi va eski yozuvlar o'qishda e'tiborsiz
+    qoldiriladi (TTL tugaguncha Redis'da qoladi). Generation va yozuv bitta
+    MGET bilan olinadi. Redis ishlamay qolsa qidiruv to'g'ridan-to'g'ri
+    Elasticsearch'ga boradi.
+    """
+
+    def __init__(self, ttl: int, enabled: bool = True):
+        self.ttl = ttl
+        self.enabled = enabled
+
+    def _decode(self, generation, raw) -> dict | None:
+        if raw is None:
+            SEARCH_CACHE_REQUESTS.labels(result="miss").inc()
+            return None
+        entry = orjson.loads(raw)
+        if entry["generation"] != int(generation or 0):
+            SEARCH_CACHE_REQUESTS.labels(result="stale").inc()
+            return None
+        SEARCH_CACHE_REQUESTS.labels(result="hit").inc()
+        return entry
+
+    def _encode(self, generation, entry: dict) -> bytes:
+        return orjson.dumps({**entry, "generation": int(generation or 0)})
+
+    def get(self, key: str) -> tuple[int | None, dict | None]:
+        """(generation, yozuv) qaytaradi; generation keyin `set` ga uzatiladi."""
+        if not self.enabled:
+            return None, None
+        try:
+            generation, raw = get_redis().mget(GENERATION_KEY, key)
+        except redis.RedisError as e:
+            logger.warning(f"Search cache Redis read failed: {e}")
+            SEARCH_CACHE_REQUESTS.labels(result="error").inc()
+            return None, None
+        return generation, self._decode(generation, raw)
+
+    async def aget(self, key: str) -> tuple[int | None, dict | None]:
+        if not self.enabled:
+            return None, None
+        try:
+            generation, raw = await get_async_redis().mget(GENERATION_KEY, key)
+        except redis.RedisError as e:
+            logger.warning(f"Search cache Redis read failed: {e}")
+            SEARCH_CACHE_REQUESTS.labels(result="error").inc()
+            return None, None
+        return generation, self._decode(generation, raw)
+
+    def set(self, key: str, generation, entry: dict) -> None:
+        # Yozuv o'qishdan oldingi generation bilan saqlanadi: qidiruv paytida
+        # indeks o'zgargan bo'lsa, u keyingi o'qishda eskirgan deb topiladi.
+        if not self.enabled:
+            return
+        try:
+            get_redis().set(key, self._encode(generation, entry), ex=self.ttl)
+        except redis.RedisError as e:
+            logger.warning(f"Search cache Redis write failed: {e}")
+
+    async def aset(self, key: str, generation, entry: dict) -> None:
+        if not self.enabled:
+            return
+        try:
+            await get_async_redis().set(key, self._encode(generation, entry), ex=self.ttl)
+        except redis.RedisError as e:
+            logger.warning(f"Search cache Redis write failed: {e}")
+
+    def bump_generation(self) -> None:
+        """Indeks o'zgarganda chaqiriladi: barcha keshlangan sahifalar eskiradi."""
+        try:
+            get_redis().incr(GENERATION_KEY)
+        except redis.RedisError as e:
+            logger.warning(f"Search cache generation bump failed: {e}")
+
+
+class HotQueryCache:
+    """
+    Jarayon ichidagi kichik LRU + TTL kesh (inline rejim uchun: Redis'ga ham
+    borishsiz). Bir vaqtda ko'p foydalanuvchi yozayotgan mashhur so'rovlar
+    tayyor javobni shu yerdan oladi.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(key, None)
+            SEARCH_CACHE_REQUESTS.labels(result="hot_miss").inc()
+            return None
+        self._entries.move_to_end(key)
+        SEARCH_CACHE_REQUESTS.labels(result="hot_hit").inc()
+        return entry[1]
+
+    def set(self, key, value) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+search_cache = SearchCache(ttl=settings.SEARCH_CACHE_TTL, enabled=settings.SEARCH_CACHE_ENABLED)
+inline_cache = HotQueryCache(maxsize=settings.INLINE_HOT_CACHE_SIZE, ttl=settings.INLINE_HOT_CACHE_TTL)
@@ -0,0 +1,215 @@
+# search_indexing.py
+
+import logging
+import time
+
+import redis
+from django.conf import settings
+from elasticsearch import ApiError, TransportError
+from elasticsearch.helpers import bulk
+from elasticsearch_dsl.connections import connections
+
+from .documents import TgFileDocument
+from .extraction import extract_text, store_content_text
+from .metrics import SEARCH_INDEX_DOCS
+from .models import TgFile
+from .redis_client import get_redis
+from .search_cache import search_cache
+
+logger = logging.getLogger(__name__)
+
+# Indekslanishi kerak bo'lgan TgFile ID'lari: score — navbatga birinchi tushgan vaqt
+PENDING_KEY = "kuku_ai_bot:search_index:pending"
+# Navbat uchun task allaqachon rejalashtirilgan (har bir saqlash alohida task yaratmaydi)
+SCHEDULED_KEY = "kuku_ai_bot:search_index:scheduled"
+STATUS_KEY = "kuku_ai_bot:search_index:status"
+# ID -> ketma-ket muvaffaqiyatsiz urinishlar soni
+ATTEMPTS_KEY = "kuku_ai_bot:search_index:attempts"
+# `SEARCH_INDEX_MAX_ATTEMPTS` marta indekslanmagan ID'lar (score — birinchi navbat vaqti).
+# Fayl qayta saqlansa yoki admin'da qayta indekslansa navbatga qaytadi
+PARKED_KEY = "kuku_ai_bot:search_index:parked"
+# Bulk elementining shu status'lari vaqtinchalik (navbatga qaytariladi), qolganlari — hujjatning o'zida
+RETRY_STATUSES = {429}
+# Task yo'qolsa (worker o'chib qolsa) bayroq shuncha vaqtdan keyin o'chadi va yangi task rejalashtiriladi
+SCHEDULE_GRACE_SECONDS = 300
+
+
+def enqueue(file_ids) -> None:
+    """
+    TgFile ID'larini indekslash navbatiga qo'shadi (saqlash/o'chirish signallaridan,
+    `on_commit` ichida). Takroriy saqlashlar bitta yozuvga birlashadi; worker
+    faylning bazadagi eng so'nggi holatini indekslaydi (yo'q bo'lsa — o'chiradi).
+    """
+    file_ids = [file_id for file_id in file_ids if file_id is not None]
+    if not file_ids:
+        return
+    now = time.time()
+    members = [str(file_id) for file_id in file_ids]
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.zadd(PENDING_KEY, {member: now for member in members}, nx=True)
+        # O'zgargan fayl yana sinaladi
+        pipe.zrem(PARKED_KEY, *members)
+        pipe.hdel(ATTEMPTS_KEY, *members)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.error(f"Search index enqueue failed for {len(file_ids)} files: {e}")
+        return
+    schedule(settings.SEARCH_INDEX_DELAY)
+
+
+def schedule(delay: float) -> None:
+    """`delay` soniyadan keyin navbatni qayta ishlovchi task (agar hali rejalashtirilmagan bo'lsa)."""
+    from .tasks import index_pending_files_task
+
+    try:
+        scheduled = get_redis().set(SCHEDULED_KEY, 1, nx=True, ex=int(delay) + SCHEDULE_GRACE_SECONDS)
+    except redis.RedisError as e:
+        logger.error(f"Search index scheduling failed: {e}")
+        return
+    if scheduled:
+        index_pending_files_task.apply_async(countdown=delay)
+
+
+def index_pending() -> int:
+    """
+    Navbatdagi ID'larni eng eskisidan boshlab `SEARCH_INDEX_BATCH_SIZE` talik
+    partiyalarda oladi, matnni ajratadi va har bir partiyani bitta `bulk`
+    so'rovi bilan yozadi. Elasticsearch ishlamasa partiya navbatga qaytariladi
+    va task `SEARCH_INDEX_RETRY_DELAY` dan keyin qayta rejalashtiriladi.
+    Boshqa xatoda (baza, matn ajratish) partiya fayllari birma-bir sinaladi:
+    bitta buzilgan fayl butun navbatni to'xtatmaydi. Indekslanmagan fayllar
+    (bulk'dagi 429/5xx ham) birinchi navbat vaqti bilan qaytariladi,
+    `SEARCH_INDEX_MAX_ATTEMPTS` urinishdan keyin esa chetga olinadi (`PARKED_KEY`).
+    """
+    client = get_redis()
+    # Shu paytdan keyingi saqlashlar yangi task rejalashtiradi
+    client.delete(SCHEDULED_KEY)
+    indexed = 0
+    while batch := client.zpopmin(PENDING_KEY, settings.SEARCH_INDEX_BATCH_SIZE):
+        file_ids = [int(member) for member, _ in batch]
+        try:
+            try:
+                failed = index_files(file_ids)
+            except (ApiError, TransportError):
+                raise
+            except Exception:
+                if len(file_ids) == 1:
+                    logger.exception(f"Search indexing of file {file_ids[0]} failed")
+                    failed = file_ids
+                else:
+                    logger.exception(f"Search index batch of {len(file_ids)} files failed, retrying one by one")
+                    failed = _index_separately(file_ids)
+        except (ApiError, TransportError):
+            # Partiya (birinchi navbat vaqtlari bilan) qaytariladi; watermark oldinga siljimaydi
+            client.zadd(PENDING_KEY, {member: score for member, score in batch}, nx=True)
+            logger.exception(f"Search index batch of {len(file_ids)} files failed, requeued")
+            schedule(settings.SEARCH_INDEX_RETRY_DELAY)
+            break
+
+        requeued = _retry_later(client, batch, failed)
+        done = len(file_ids) - len(failed)
+        indexed += done
+        status = {"last_run": time.time(), "last_batch": done}
+        # Watermark: shu vaqtgacha navbatga tushgan barcha o'zgarishlar indeksda (chetga olinganlardan tashqari).
+        # Qaytarilgan fayllardan o'tib ketmaydi
+        first_requeued = min((position for position, (member, _) in enumerate(batch) if int(member) in requeued),
+                             default=len(batch))
+        if first_requeued:
+            status["watermark"] = batch[first_requeued - 1][1]
+        client.hset(STATUS_KEY, mapping=status)
+        client.hincrby(STATUS_KEY, "indexed_total", done)
+        if requeued:
+            # Aks holda zpopmin ularni darhol yana oladi
+            schedule(settings.SEARCH_INDEX_RETRY_DELAY)
+            break
+    return indexed
+
+
+def _index_separately(file_ids: list[int]) -> list[int]:
+    """Partiyadagi fayllarni birma-bir indekslaydi; indekslanmaganlarini qaytaradi."""
+    failed = []
+    for file_id in file_ids:
+        try:
+            failed += index_files([file_id])
+        except (ApiError, TransportError):
+            raise
+        except Exception:
+            logger.exception(f"Search indexing of file {file_id} failed")
+            failed.append(file_id)
+    return failed
+
+
+def _retry_later(client, batch: list, failed: list[int]) -> set[int]:
+    """
+    Indekslanmagan fayllarni birinchi navbat vaqti bilan qaytaradi yoki (urinishlar
+    tugagan bo'lsa) chetga oladi. Navbatga qaytarilgan ID'lar to'plamini qaytaradi.
+    """
+    scores = {int(member): score for member, score in batch}
+    succeeded = [str(file_id) for file_id in scores if file_id not in failed]
+    if succeeded:
+        client.hdel(ATTEMPTS_KEY, *succeeded)
+    requeued = set()
+    for file_id in failed:
+        attempts = client.hincrby(ATTEMPTS_KEY, str(file_id), 1)
+        if attempts >= settings.SEARCH_INDEX_MAX_ATTEMPTS:
+            client.zadd(PARKED_KEY, {str(file_id): scores[file_id]})
+            client.hdel(ATTEMPTS_KEY, str(file_id))
+            logger.error(f"Search indexing of file {file_id} failed {attempts} times, parked")
+        else:
+            client.zadd(PENDING_KEY, {str(file_id): scores[file_id]}, nx=True)
+            requeued.add(file_id)
+    return requeued
+
+
+def index_files(file_ids: list[int]) -> list[int]:
+    """Fayllarni indekslaydi; bulk'da vaqtinchalik (429/5xx) xato bergan ID'larni qaytaradi."""
+    files = TgFile.objects.select_related('subcategory__category').in_bulk(file_ids)
+    if settings.SEARCH_BACKEND == 'database':
+        # ES'siz rejim: faqat bazadagi qidiruv uchun matn ajratiladi
+        for tg_file in files.values():
+            store_content_text(tg_file, extract_text(tg_file))
+        return []
+
+    document = TgFileDocument()
+    index = document._index._name
+    actions = []
+    for file_id in file_ids:
+        tg_file = files.get(file_id)
+        if tg_file is None:
+            actions.append({"_op_type": "delete", "_index": index, "_id": file_id})
+        else:
+            actions.append({"_op_type": "index", "_index": index, "_id": file_id, "_source": document.prepare(tg_file)})
+
+    success, errors = bulk(connections.get_connection(), actions, raise_on_error=False)
+    # O'chirilgan, lekin indeksda hali bo'lmagan hujjat uchun 404 — xato emas
+    errors = [error for error in errors if error.get('delete', {}).get('status') != 404]
+    SEARCH_INDEX_DOCS.labels(result="ok").inc(success)
+    retry = []
+    if errors:
+        SEARCH_INDEX_DOCS.labels(result="error").inc(len(errors))
+        logger.error(f"Search index bulk had {len(errors)} failed items, first: {errors[0]}")
+        for error in errors:
+            # {"index": {"_id": ..., "status": ..., "error": ...}}
+            item = next(iter(error.values()))
+            if item.get('status') in RETRY_STATUSES or item.get('status', 0) >= 500:
+                retry.append(int(item['_id']))
+    search_cache.bump_generation()
+    return retry
+
+
+def index_status() -> dict:
+    """Admin sahifasi uchun: navbat uzunligi, eng eski kutayotgan yozuv va watermark."""
+    client = get_redis()
+    oldest = client.zrange(PENDING_KEY, 0, 0, withscores=True)
+    status = {key.decode(): float(value) for key, value in client.hgetall(STATUS_KEY).items()}
+    return {
+        "pending": client.zcard(PENDING_KEY),
+        "parked": client.zcard(PARKED_KEY),
+        "oldest_pending": oldest[0][1] if oldest else None,
+        "scheduled": bool(client.exists(SCHEDULED_KEY)),
+        "watermark": status.get("watermark"),
+        "last_run": status.get("last_run"),
+        "last_batch": int(status.get("last_batch", 0)),
+        "indexed_total": int(status.get("indexed_total", 0)),
+    }
@@ -0,0 +1,290 @@
+# search_session.py
+
+import logging
+import secrets
+import time
+
+import orjson
+import redis
+from django.conf import settings
+from elasticsearch import NotFoundError
+from elasticsearch_dsl import Q, Search
+
+from .redis_client import get_async_redis
+from .search import (DISPLAY_FIELDS, PAGE_SIZE, FileHit, SearchPage, add_highlight, filtered_query, get_async_client,
+                     index_name)
+from .search_backends import PRIMARY_ERRORS, get_backend
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY = "kuku_ai_bot:search_session:{session_id}"
+# Ochiq PIT'lar: score — sessiya muddati tugaydigan vaqt (muddati o'tganlari yopiladi)
+PITS_KEY = "kuku_ai_bot:search_session:pits"
+# PIT ichida barqaror tartib: avval score, teng bo'lsa shard ichidagi hujjat tartibi
+PIT_SORT = [{"_score": "desc"}, {"_shard_doc": "asc"}]
+
+
+def session_key(session_id: str) -> str:
+    return SESSION_KEY.format(session_id=session_id)
+
+
+async def close_pit(pit_id: str) -> None:
+    try:
+        await get_async_client().close_point_in_time(id=pit_id)
+    except NotFoundError:
+        # Keep-alive tugab, Elasticsearch o'zi yopgan
+        pass
+    except PRIMARY_ERRORS as e:
+        logger.warning(f"Search session PIT close failed ({type(e).__name__})")
+
+
+class SearchSession:
+    """
+    Birinchi qidiruvda yaratiladigan, sahifalash uchun natijalar "surati".
+
+    Sessiya yaratish — bitta so'rov: birinchi sahifa, jami son va facet'lar.
+    Natijalar bir sahifaga sig'sa, hit'lar (ko'rsatiladigan maydonlar) shu
+    yerda saqlanadi. Aks holda "surat" birinchi sahifalashda olinadi: natija
+    `SEARCH_SESSION_MAX_IDS` gacha bo'lsa — `_source`siz tartiblangan ID
+    ro'yxati (sahifa — shu ID'lar bo'yicha so'rov), ko'p bo'lsa —
+    Elasticsearch point-in-time (PIT) va har bir sahifa oldingi sahifaning
+    oxirgi `sort` qiymatidan (`search_after`) boshlab olinadi. Shundan keyin
+    sahifa bosilishi indeks o'zgarishidan ta'sirlanmaydi va chuqur sahifalar
+    `from/size` kabi qimmatlashib bormaydi. Sessiya Redis'da saqlanadi, shuning
+    uchun callback istalgan worker'ga tushishi mumkin; `callback_data` da
+    faqat qisqa ID bo'ladi. Sessiya natija bergan fallback tier'ini (`tier`)
+    ham saqlaydi — keyingi sahifalar aynan shu so'rov bilan olinadi. Facet
+    filtrlari (`filters`) va birinchi so'rovdagi facet sonlari (`facets`) ham
+    sessiyada: facet tugmasi bosilganda filtrlangan yangi sessiya yaratiladi.
+    Qidiruv `search_backends.get_backend()` orqali: Elasticsearch ishlamasa natija
+    bazadan (tier "database") olinadi va keyingi sahifalar ham bazadan so'raladi.
+    PIT sessiya almashtirilganda (`release`) yoki muddati o'tganda yopiladi.
+    """
+
+    def __init__(self, session_id: str, query: str, search_mode: str, tier: str | None, total: int,
+                 total_is_exact: bool, hits: list[dict] | None = None, ids: list[int] | None = None,
+                 pit_id: str | None = None, cursors: dict | None = None, page_size: int = PAGE_SIZE,
+                 filters: dict | None = None, facets: dict | None = None):
+        self.session_id = session_id
+        self.query = query
+        self.search_mode = search_mode
+        self.tier = tier
+        self.total = total
+        self.total_is_exact = total_is_exact
+        self.hits = hits
+        self.ids = ids
+        self.pit_id = pit_id
+        # sahifa raqami (str) -> shu sahifadan oldingi oxirgi hit'ning sort qiymatlari
+        self.cursors = cursors or {}
+        self.page_size = page_size
+        self.filters = filters or {}
+        self.facets = facets or {}
+
+    @classmethod
+    async def create(cls, query: str, search_mode: str,
+                     filters: dict | None = None) -> tuple["SearchSession", SearchPage]:
+        """Sessiya yaratadi va birinchi sahifani qaytaradi (natija bo'lmasa tier — None)."""
+        tier, first = await get_backend().search(query, search_mode, page_size=PAGE_SIZE, filters=filters,
+                                                 with_facets=True)
+        session = cls(secrets.token_hex(4), query, search_mode, tier, first.total, first.total_is_exact,
+                      filters=filters, facets=first.facets)
+        if tier is None:
+            session.hits = []
+            return session, session._slice(1)
+        if first.total_is_exact and first.total <= PAGE_SIZE:
+            session.hits = [hit.to_dict() for hit in first.hits]
+        await session.save()
+        return session, first
+
+    @classmethod
+    async def load(cls, session_id: str) -> "SearchSession | None":
+        try:
+            raw = await get_async_redis().get(session_key(session_id))
+        except redis.RedisError as e:
+            logger.warning(f"Search session Redis read failed: {e}")
+            return None
+        if raw is None:
+            return None
+        return cls(session_id, **orjson.loads(raw))
+
+    async def save(self) -> None:
+        data = {
+            "query": self.query,
+            "search_mode": self.search_mode,
+            "tier": self.tier,
+            "total": self.total,
+            "total_is_exact": self.total_is_exact,
+            "hits": self.hits,
+            "ids": self.ids,
+            "pit_id": self.pit_id,
+            "cursors": self.cursors,
+            "page_size": self.page_size,
+            "filters": self.filters,
+            "facets": self.facets,
+        }
+        try:
+            async with get_async_redis().pipeline(transaction=False) as pipe:
+                pipe.set(session_key(self.session_id), orjson.dumps(data), ex=settings.SEARCH_SESSION_TTL)
+                if self.pit_id:
+                    pipe.zadd(PITS_KEY, {self.pit_id: time.time() + settings.SEARCH_SESSION_TTL})
+                await pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Search session Redis write failed: {e}")
+
+    @classmethod
+    async def release(cls, session_id: str | None) -> None:
+        """
+        Chat'da yangi qidiruv yoki facet bilan almashtirilgan sessiyaning PIT'ini
+        yopadi. Sessiyaning o'zi TTL gacha qoladi: eski xabardagi sahifalash
+        ishlayveradi (PIT yo'q — `NotFoundError`, sahifa from/size bilan olinadi).
+        """
+        if not session_id:
+            return
+        session = await cls.load(session_id)
+        if session is None or not session.pit_id:
+            return
+        try:
+            await get_async_redis().zrem(PITS_KEY, session.pit_id)
+        except redis.RedisError as e:
+            logger.warning(f"Search session Redis write failed: {e}")
+        await close_pit(session.pit_id)
+
+    @staticmethod
+    async def close_expired_pits() -> None:
+        """Sessiyasi Redis'da muddati o'tgan PIT'larni yopadi (yangi PIT ochilishidan oldin)."""
+        client = get_async_redis()
+        now = time.time()
+        try:
+            expired = await client.zrangebyscore(PITS_KEY, "-inf", now)
+            if expired:
+                await client.zrem(PITS_KEY, *expired)
+        except redis.RedisError as e:
+            logger.warning(f"Search session PIT sweep failed: {e}")
+            return
+        for pit_id in expired:
+            await close_pit(pit_id.decode() if isinstance(pit_id, bytes) else pit_id)
+
+    async def page(self, page_number: int) -> SearchPage:
+        if self.hits is not None:
+            return self._slice(page_number)
+        if self.tier == 'database':
+            # Bazada PIT yo'q: sahifa to'g'ridan-to'g'ri (LIMIT/OFFSET) so'raladi
+            return await self._backend_page(page_number)
+        try:
+            if self.ids is None and self.pit_id is None:
+                await self._snapshot()
+            if self.ids is not None:
+                page = await self._ids_page(page_number)
+            else:
+                page = await self._pit_page(page_number)
+        except NotFoundError:
+            # PIT muddati tugagan: sahifani oddiy from/size so'rovi bilan beramiz
+            logger.info(f"Search session {self.session_id} PIT expired, falling back to from/size")
+            return await self._backend_page(page_number)
+        except PRIMARY_ERRORS as e:
+            # Elasticsearch ishlamayapti: sahifa backend orqali (kerak bo'lsa bazadan) olinadi
+            logger.warning(f"Search session {self.session_id} paging failed ({type(e).__name__})")
+            return await self._backend_page(page_number)
+        await self.save()
+        return page
+
+    async def _snapshot(self) -> None:
+        """Birinchi sahifalashda: kam natija uchun ID ro'yxati, ko'p bo'lsa — PIT."""
+        max_ids = settings.SEARCH_SESSION_MAX_IDS
+        if self.total_is_exact and self.total <= max_ids:
+            body = self._search().extra(size=max_ids, track_total_hits=False).source(False).to_dict()
+            response = await get_async_client().search(index=index_name(), body=body)
+            self.ids = [int(hit["_id"]) for hit in response.body["hits"]["hits"]]
+            self.total = len(self.ids)
+            return
+        await self.close_expired_pits()
+        response = await get_async_client().open_point_in_time(
+            index=index_name(), keep_alive=settings.SEARCH_SESSION_PIT_KEEP_ALIVE
+        )
+        self.pit_id = response["id"]
+
+    async def _backend_page(self, page_number: int) -> SearchPage:
+        page = await get_backend().page(self.query, self.search_mode, page_number, page_size=self.page_size,
+                                        tier=self.tier, filters=self.filters)
+        # Zaxira backend boshqa jami son qaytarishi mumkin; sahifalash sessiyadagi son bilan qoladi
+        page.total, page.total_is_exact = self.total, self.total_is_exact
+        return page
+
+    def _slice(self, page_number: int) -> SearchPage:
+        start = (page_number - 1) * self.page_size
+        return SearchPage(
+            hits=[FileHit(**hit) for hit in self.hits[start:start + self.page_size]],
+            total=self.total,
+            total_is_exact=self.total_is_exact,
+            number=page_number,
+            page_size=self.page_size,
+        )
+
+    def _search(self) -> Search:
+        return Search().query(filtered_query(self.query, self.search_mode, self.tier, self.filters))
+
+    async def _ids_page(self, page_number: int) -> SearchPage:
+        start = (page_number - 1) * self.page_size
+        page_ids = self.ids[start:start + self.page_size]
+        hits = []
+        if page_ids:
+            s = self._search().filter(Q('ids', values=[str(file_id) for file_id in page_ids]))
+            body = add_highlight(s.source(DISPLAY_FIELDS), self.search_mode, self.tier).to_dict()
+            body.update({"size": len(page_ids), "track_total_hits": False})
+            response = await get_async_client().search(index=index_name(), body=body)
+            # Sessiyadagi tartib saqlanadi; o'chirilgan fayllar tushib qoladi
+            by_id = {int(hit["_id"]): hit for hit in response.body["hits"]["hits"]}
+            hits = [by_id[file_id] for file_id in page_ids if file_id in by_id]
+        return SearchPage(
+            hits=[FileHit.from_es(hit) for hit in hits],
+            total=self.total,
+            total_is_exact=self.total_is_exact,
+            number=page_number,
+            page_size=self.page_size,
+        )
+
+    async def _pit_page(self, page_number: int) -> SearchPage:
+        # Sahifalash tugmalari faqat qo'shni sahifaga o'tadi, shuning uchun kursor
+        # deyarli har doim tayyor. Bo'lmasa, eng yaqin ma'lum kursordan oldinga yuramiz;
+        # umuman kursor bo'lmasa (PIT endi ochilgan) — sahifaga PIT ichida from/size bilan.
+        known = max((int(p) for p in self.cursors if int(p) <= page_number), default=None)
+        if known is None:
+            hits = await self._pit_search(None, start=(page_number - 1) * self.page_size)
+            if hits:
+                self.cursors[str(page_number + 1)] = hits[-1]["sort"]
+        else:
+            hits = []
+            for number in range(known, page_number + 1):
+                hits = await self._pit_search(self.cursors.get(str(number)))
+                if hits:
+                    self.cursors[str(number + 1)] = hits[-1]["sort"]
+        return SearchPage(
+            hits=[FileHit.from_es(hit) for hit in hits],
+            total=self.total,
+            total_is_exact=self.total_is_exact,
+            number=page_number,
+            page_size=self.page_size,
+        )
+
+    async def _pit_search(self, search_after: list | None, start: int = 0) -> list[dict]:
+        body = add_highlight(self._search().source(DISPLAY_FIELDS), self.search_mode, self.tier).to_dict()
+        body.update({
+            "size": self.page_size,
+            "sort": PIT_SORT,
+            "pit": {"id": self.pit_id, "keep_alive": settings.SEARCH_SESSION_PIT_KEEP_ALIVE},
+            "track_total_hits": False,
+        })
+        if search_after is not None:
+            body["search_after"] = search_after
+        elif start:
+            body["from"] = start
+        response = await get_async_client().search(body=body)
+        # PIT ID har bir javobda yangilanishi mumkin
+        pit_id = response.body.get("pit_id", self.pit_id)
+        if pit_id != self.pit_id:
+            try:
+                await get_async_redis().zrem(PITS_KEY, self.pit_id)
+            except redis.RedisError as e:
+                logger.warning(f"Search session Redis write failed: {e}")
+            self.pit_id = pit_id
+        return response.body["hits"]["hits"]
@@ -0,0 +1,48 @@
+# signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import registry, search_indexing
+from .models import Bot, Category, SubCategory, TgFile
+
+
+@receiver(post_save, sender=Bot)
+def bot_saved(sender, instance, **kwargs):
+    """Bot o'zgarganda joriy worker registrini yangilaydi va boshqalarga xabar beradi."""
+    registry.put(instance)
+    transaction.on_commit(lambda: registry.publish_change(instance.pk))
+
+
+@receiver(post_delete, sender=Bot)
+def bot_deleted(sender, instance, **kwargs):
+    bot_id = instance.pk
+    registry.forget(bot_id)
+    transaction.on_commit(lambda: registry.publish_change(bot_id))
+
+
+@receiver(post_save, sender=TgFile)
+@receiver(post_delete, sender=TgFile)
+def tg_file_changed(sender, instance, **kwargs):
+    """
+    Fayl indekslash navbatiga qo'yiladi (matn ajratish va ES'ga yozish — Celery
+    worker'da). Qidiruv keshi worker indeksni yangilagandan keyin eskiradi.
+    """
+    file_id = instance.pk
+    transaction.on_commit(lambda: search_indexing.enqueue([file_id]))
+
+
+@receiver(post_save, sender=SubCategory)
+@receiver(pre_delete, sender=SubCategory)
+def subcategory_changed(sender, instance, **kwargs):
+    # O'chirishda fayllar subkategoriyasiz qoladi (SET_NULL), shuning uchun ID'lar oldindan olinadi
+    file_ids = list(instance.tgfile_set.values_list('pk', flat=True))
+    transaction.on_commit(lambda: search_indexing.enqueue(file_ids))
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    file_ids = list(TgFile.objects.filter(subcategory__category=instance).values_list('pk', flat=True))
+    transaction.on_commit(lambda: search_indexing.enqueue(file_ids))
@@ -0,0 +1,85 @@
+# synthetic.py
+# Qidiruv benchmark'lari uchun sintetik (o'zbek, rus, ingliz, turk) hujjatlar korpusi.
+
+import random
+
+WORDS = {
+    'uz': [
+        "matematika", "fizika", "kimyo", "biologiya", "tarix", "adabiyot", "iqtisodiyot", "huquq",
+        "dasturlash", "algoritm", "ma'ruza", "amaliy", "mashg'ulot", "nazorat", "savollar", "javoblar",
+        "oliy", "umumiy", "asoslari", "kurs", "ishi", "fan", "dasturi", "laboratoriya", "imtihon",
+        "o'quv", "qo'llanma", "darslik", "topshiriq", "mustaqil", "semestr", "kafedra", "talaba",
+    ],
+    'ru': [
+        "математика", "физика", "химия", "история", "экономика", "право", "программирование",
+        "лекции", "практика", "задачи", "решения", "экзамен", "билеты", "учебник", "пособие",
+        "курсовая", "работа", "лабораторная", "основы", "введение", "методичка", "конспект",
+    ],
+    'en': [
+        "mathematics", "physics", "chemistry", "history", "economics", "law", "programming",
+        "lecture", "notes", "practice", "problems", "solutions", "exam", "questions", "textbook",
+        "introduction", "fundamentals", "course", "lab", "assignment", "handbook", "guide",
+    ],
+    'tr': [
+        "matematik", "fizik", "kimya", "tarih", "ekonomi", "hukuk", "programlama", "ders",
+        "notları", "uygulama", "sorular", "cevaplar", "sınav", "kitap", "giriş", "temelleri",
+    ],
+}
+FILE_TYPES = ['pdf', 'pdf', 'pdf', 'doc', 'doc', 'zip', 'media', 'other']
+EXTENSIONS = {'pdf': 'pdf', 'doc': 'docx', 'zip': 'zip', 'media': 'mp4', 'other': 'pptx'}
+# (id, nomi) — facet'lar uchun TgFileDocument'dagi subcategory/category obyektlari
+CATEGORIES = [(1, "Aniq fanlar"), (2, "Tabiiy fanlar"), (3, "Ijtimoiy fanlar"), (4, "Tillar")]
+SUBCATEGORIES = [
+    (1, "Matematika", 1), (2, "Fizika", 1), (3, "Informatika", 1),
+    (4, "Kimyo", 2), (5, "Biologiya", 2),
+    (6, "Tarix", 3), (7, "Iqtisodiyot", 3), (8, "Huquq", 3),
+    (9, "Ingliz tili", 4), (10, "Rus tili", 4),
+]
+
+
+def _phrase(rng: random.Random, lang: str, count: int) -> str:
+    return " ".join(rng.choice(WORDS[lang]) for _ in range(count))
+
+
+def generate_document(rng: random.Random, index: int) -> dict:
+    lang = rng.choice(list(WORDS))
+    title = _phrase(rng, lang, rng.randint(2, 6)).capitalize()
+    file_type = rng.choice(FILE_TYPES)
+    return {
+        'title': title,
+        'file_name': f"{title.replace(' ', '_').lower()}_{index}.{EXTENSIONS[file_type]}",
+        'description': _phrase(rng, lang, rng.randint(5, 25)),
+        'content': _phrase(rng, lang, rng.randint(50, 400)) if file_type == 'pdf' else "",
+        'file_type': file_type,
+        'size_in_bytes': rng.randint(20_000, 30_000_000),
+        **_taxonomy(rng),
+    }
+
+
+def _taxonomy(rng: random.Random) -> dict:
+    if rng.random() < 0.1:
+        return {'subcategory': None, 'category': None}
+    sub_id, sub_name, category_id = rng.choice(SUBCATEGORIES)
+    return {
+        'subcategory': {'id': sub_id, 'name': sub_name},
+        'category': {'id': category_id, 'name': dict(CATEGORIES)[category_id]},
+    }
+
+
+def generate_documents(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    for index in range(count):
+        yield generate_document(rng, index)
+
+
+def generate_queries(count: int, seed: int = 7) -> list[str]:
+    """Foydalanuvchi so'rovlariga o'xshash: 1-3 so'z, ba'zan oxirgi so'z chala yozilgan."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        lang = rng.choice(list(WORDS))
+        words = [rng.choice(WORDS[lang]) for _ in range(rng.randint(1, 3))]
+        if rng.random() < 0.4 and len(words[-1]) > 4:
+            words[-1] = words[-1][:rng.randint(3, len(words[-1]) - 1)]
+        queries.append(" ".join(words))
+    return queries
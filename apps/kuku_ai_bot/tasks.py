@@ -2,13 +2,11 @@ import time
 import logging
 from celery import shared_task
 from django.utils import timezone
-from asgiref.sync import async_to_sync
-
-# Telegram klasslarini to'g'ridan-to'g'ri import qilamiz
-from telegram import Bot as TelegramBot
 from telegram.error import TelegramError
 
 from .models import Broadcast, BroadcastRecipient, User
+from .search_indexing import index_pending
+from .telegram_http import get_bot, run_async
 
 logger = logging.getLogger(__name__)
 
@@ -63,7 +61,8 @@ def send_message_to_user_task(recipient_id):
     async def main_async_logic():
         broadcast = recipient.broadcast
         user = recipient.user
-        bot = TelegramBot(token=broadcast.bot.token)
+        # Worker jarayonidagi umumiy ulanishlar havzasi ishlatiladi
+        bot = get_bot(broadcast.bot.token)
         try:
             await bot.forward_message(
                 chat_id=user.telegram_id,
@@ -87,5 +86,13 @@ def send_message_to_user_task(recipient_id):
         # O'zgarishlarni asinxron saqlash
         await recipient.asave()
 
-    # asgiref orqali asinxron funksiyani sinxron task ichida ishga tushirish
-    async_to_sync(main_async_logic)()
\ No newline at end of file
+    # Worker thread'ining doimiy event loop'ida ishga tushiramiz, shunda
+    # ulanishlar task'lar orasida qayta ishlatiladi
+    run_async(main_async_logic())
+
+
+@shared_task
+def index_pending_files_task():
+    """Navbatdagi TgFile'larni partiyalab Elasticsearch'ga yozadi (search_indexing.index_pending)."""
+    indexed = index_pending()
+    logger.info(f"Search index task indexed {indexed} files")
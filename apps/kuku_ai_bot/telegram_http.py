@@ -0,0 +1,124 @@
+# telegram_http.py
+
+import asyncio
+import threading
+
+import httpx
+from django.conf import settings
+from telegram import Bot as TelegramBot
+from telegram.request import HTTPXRequest
+
+from .metrics import TELEGRAM_HTTP_NEW_CONNECTIONS, TELEGRAM_HTTP_REQUESTS
+
+# Har bir thread o'z event loop'ida ishlaydi (uvicorn — asosiy thread, Celery va
+# admin — o'z thread'lari), httpx ulanishlari esa loop'ga bog'langan. Shu sababli
+# umumiy havza, Bot obyektlari va doimiy event loop thread bo'yicha saqlanadi.
+_local = threading.local()
+
+
+async def _trace(event_name: str, info: dict) -> None:
+    # httpcore "trace" kengaytmasi: yangi TCP ulanish ochilganda chaqiriladi
+    if event_name == "connection.connect_tcp.complete":
+        TELEGRAM_HTTP_NEW_CONNECTIONS.inc()
+
+
+class CountingTransport(httpx.AsyncHTTPTransport):
+    """So'rovlar va yangi ulanishlarni sanaydi (ulanishlardan qayta foydalanish metrikasi uchun)."""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        TELEGRAM_HTTP_REQUESTS.inc()
+        request.extensions["trace"] = _trace
+        return await super().handle_async_request(request)
+
+
+class SharedHTTPXRequest(HTTPXRequest):
+    """
+    Barcha botlar uchun bitta sozlanadigan httpx ulanishlar havzasi.
+
+    Bir nechta Bot/Application bir obyektni ishlatgani uchun initialize/shutdown
+    hisoblanadi: havza oxirgi foydalanuvchi shutdown qilganda yopiladi.
+    Fayl yuklovchi so'rovlar (send_document va h.k.) ulanishni
+    `media_write_timeout` gacha band qiladi, shuning uchun ular alohida
+    havzaga (`TELEGRAM_HTTP_UPLOAD_POOL_SIZE`) yuboriladi — yuklashlar oqimi
+    barcha botlarning sendMessage'ini PoolTimeout'ga olib kelmasligi uchun.
+    """
+
+    def __init__(self, pool_size: int | None = None, pool_timeout: float | None = None,
+                 separate_uploads: bool = True):
+        pool_size = pool_size or settings.TELEGRAM_HTTP_POOL_SIZE
+        self._transport_kwargs = {
+            "http1": settings.TELEGRAM_HTTP_VERSION == "1.1",
+            "http2": settings.TELEGRAM_HTTP_VERSION != "1.1",
+            "limits": httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=settings.TELEGRAM_HTTP_KEEPALIVE_EXPIRY,
+            ),
+        }
+        self._users = 0
+        self._uploads = SharedHTTPXRequest(
+            settings.TELEGRAM_HTTP_UPLOAD_POOL_SIZE, settings.TELEGRAM_HTTP_UPLOAD_POOL_TIMEOUT, separate_uploads=False,
+        ) if separate_uploads else None
+        super().__init__(
+            connection_pool_size=pool_size,
+            read_timeout=settings.TELEGRAM_HTTP_READ_TIMEOUT,
+            write_timeout=settings.TELEGRAM_HTTP_WRITE_TIMEOUT,
+            connect_timeout=settings.TELEGRAM_HTTP_CONNECT_TIMEOUT,
+            pool_timeout=pool_timeout or settings.TELEGRAM_HTTP_POOL_TIMEOUT,
+            media_write_timeout=settings.TELEGRAM_HTTP_MEDIA_WRITE_TIMEOUT,
+            http_version=settings.TELEGRAM_HTTP_VERSION,
+        )
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        if self._uploads is not None and request_data is not None and request_data.contains_files:
+            return await self._uploads.do_request(url, method, request_data, **kwargs)
+        return await super().do_request(url, method, request_data, **kwargs)
+
+    def _build_client(self) -> httpx.AsyncClient:
+        # transport berilganda httpx klientning limits/http2 parametrlarini e'tiborsiz qoldiradi
+        return httpx.AsyncClient(**{**self._client_kwargs, "transport": CountingTransport(**self._transport_kwargs)})
+
+    async def initialize(self) -> None:
+        self._users += 1
+        await super().initialize()
+        if self._uploads is not None:
+            await self._uploads.initialize()
+
+    async def shutdown(self) -> None:
+        if self._uploads is not None:
+            await self._uploads.shutdown()
+        self._users -= 1
+        if self._users <= 0:
+            self._users = 0
+            await super().shutdown()
+
+
+def get_request() -> SharedHTTPXRequest:
+    """Joriy thread uchun umumiy HTTP so'rov obyekti."""
+    if not hasattr(_local, "request"):
+        _local.request = SharedHTTPXRequest()
+    return _local.request
+
+
+def get_bot(token: str) -> TelegramBot:
+    """
+    Token bo'yicha qayta ishlatiladigan telegram.Bot. Har bir chaqiruvda yangi
+    Bot (va yangi ulanishlar havzasi, yangi TLS handshake) yaratmaslik uchun.
+    """
+    if not hasattr(_local, "bots"):
+        _local.bots = {}
+    if token not in _local.bots:
+        _local.bots[token] = TelegramBot(token=token, base_url=settings.TELEGRAM_BOT_API_URL, request=get_request())
+    return _local.bots[token]
+
+
+def run_async(coro):
+    """
+    Sinxron kodda (Celery task, admin form) coroutine'ni thread'ning doimiy event
+    loop'ida bajaradi. async_to_sync / asyncio.run har safar yangi loop ochadi va
+    umumiy havzadagi ulanishlar yaroqsiz bo'lib qoladi.
+    """
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _local.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(coro)
@@ -186,6 +186,20 @@ search_no_results = {
     "tr": "😔 Üzgünüz, \"{query}\" sorgunuz için sonuç bulunamadı.",
 }
 
+facet_clear = {
+    "uz": "✖️ Filtrni olib tashlash",
+    "ru": "✖️ Сбросить фильтр",
+    "en": "✖️ Clear filter",
+    "tr": "✖️ Filtreyi temizle",
+}
+
+search_session_expired = {
+    "uz": "⌛ Qidiruv natijalari eskirdi. Iltimos, so'rovni qaytadan yuboring.",
+    "ru": "⌛ Результаты поиска устарели. Пожалуйста, отправьте запрос ещё раз.",
+    "en": "⌛ These search results have expired. Please send your query again.",
+    "tr": "⌛ Arama sonuçlarının süresi doldu. Lütfen sorgunuzu tekrar gönderin.",
+}
+
 pagination_prev = {
     "uz": "⬅️ Orqaga",
     "ru": "⬅️ Назад",
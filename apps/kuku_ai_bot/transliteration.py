@@ -0,0 +1,30 @@
+# transliteration.py
+
+# O'zbek (va rus) kirill harflarini o'zbek lotin yozuviga o'tkazish jadvali.
+# Maqsad — aniq transliteratsiya emas, balki ikkala yozuvda yozilgan so'zni bir
+# xil tokenga keltirish: "Ўзбек тили" va "O'zbek tili" -> "ozbek tili".
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo', 'ж': 'j',
+    'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o',
+    'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'x', 'ц': 'ts',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'sh', 'ы': 'i', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+    # o'zbekcha harflar
+    'ў': 'o', 'қ': 'q', 'ғ': 'g', 'ҳ': 'h',
+    # qattiq/yumshoq belgi o'qilmaydi
+    'ъ': '', 'ь': '',
+}
+
+# Lotin yozuvidagi o‘, g‘ dagi belgining barcha ko'rinishlari. Standard tokenizer
+# ‘ va ʻ da so'zni bo'lib yuboradi, shuning uchun ular tashlab yuboriladi
+# (kirilldagi ў/ғ ham apostrofsiz o/g bo'ladi).
+APOSTROPHES = ["'", '‘', '’', 'ʻ', 'ʼ', '`']
+
+
+def mapping_rules() -> list[str]:
+    """Elasticsearch `mapping` char_filter qoidalari (katta harflar ham; lowercase undan keyin ishlaydi)."""
+    rules = []
+    for cyrillic, latin in CYRILLIC_TO_LATIN.items():
+        rules.append(f"{cyrillic} => {latin}")
+        rules.append(f"{cyrillic.upper()} => {latin}")
+    rules.extend(f"{mark} => " for mark in APOSTROPHES)
+    return rules
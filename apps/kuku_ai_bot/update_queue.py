@@ -0,0 +1,105 @@
+# update_queue.py
+
+import asyncio
+import logging
+import time
+
+from django.conf import settings
+from telegram import Update
+from telegram.ext import Application
+
+from .metrics import UPDATE_QUEUE_DEPTH, UPDATE_QUEUE_ENQUEUED, UPDATE_QUEUE_REJECTED, UPDATE_QUEUE_WAIT
+from .scheduler import lane_scheduler
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_REJECT = "reject"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+
+
+class UpdateQueue:
+    """
+    Webhook uchun chegaralangan in-process navbat.
+
+    Webhook update'ni navbatga qo'yib darhol 200 qaytaradi, `workers` ta consumer
+    task esa update'larni chat lane'lariga topshiradi (bajarilishini kutmasdan —
+    sekin chat boshqa chat'larni to'sib qo'ymaydi). Lane'larda bajarilayotgan
+    update'lar ham `maxsize` bilan chegaralangan. Navbat to'lsa `overflow` siyosati
+    ishlaydi: "reject" — webhook 503 qaytaradi (Telegram keyinroq qayta yuboradi),
+    "drop_oldest" — eng eski update tashlab yuboriladi.
+    """
+
+    def __init__(self, maxsize: int, workers: int, overflow: str = OVERFLOW_REJECT):
+        if overflow not in (OVERFLOW_REJECT, OVERFLOW_DROP_OLDEST):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.maxsize = maxsize
+        self.workers = workers
+        self.overflow = overflow
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        # Lane'larga topshirilgan, lekin hali tugamagan update'lar uchun joylar
+        self._slots: asyncio.Semaphore | None = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._slots = asyncio.Semaphore(self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Update queue started: maxsize={self.maxsize}, workers={self.workers}, overflow={self.overflow}")
+
+    async def stop(self, timeout: float = 10) -> None:
+        """Navbatdagi update'larni `timeout` soniya ichida tugatishga harakat qiladi, so'ng worker'larni to'xtatadi."""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Update queue stopped with {self._queue.qsize()} unprocessed update(s)")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def put(self, application: Application, update: Update) -> bool:
+        """Update'ni navbatga qo'yadi. Navbat to'lgan va siyosat "reject" bo'lsa False qaytaradi."""
+        item = (application, update, time.monotonic())
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            UPDATE_QUEUE_REJECTED.labels(policy=self.overflow).inc()
+            if self.overflow == OVERFLOW_REJECT:
+                return False
+            _, dropped, _ = self._queue.get_nowait()
+            self._queue.task_done()
+            logger.warning(f"Update queue full, dropped update {dropped.update_id}")
+            self._queue.put_nowait(item)
+        UPDATE_QUEUE_ENQUEUED.inc()
+        UPDATE_QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            await self._slots.acquire()
+            application, update, enqueued_at = await self._queue.get()
+            UPDATE_QUEUE_DEPTH.set(self._queue.qsize())
+            UPDATE_QUEUE_WAIT.observe(time.monotonic() - enqueued_at)
+            lane_scheduler.submit(application, update).add_done_callback(self._processed)
+
+    def _processed(self, future: asyncio.Future) -> None:
+        # Xato lane'ning drain task'ida log'ga yozilgan; bu yerda faqat "olingan" deb belgilanadi
+        if not future.cancelled():
+            future.exception()
+        self._slots.release()
+        self._queue.task_done()
+
+
+update_queue = UpdateQueue(
+    maxsize=settings.BOT_UPDATE_QUEUE_SIZE,
+    workers=settings.BOT_UPDATE_WORKERS,
+    overflow=settings.BOT_UPDATE_QUEUE_OVERFLOW,
+)
@@ -0,0 +1,143 @@
+# update_stream.py
+
+import asyncio
+import logging
+import os
+import socket
+import time
+
+import orjson
+import redis
+from django.conf import settings
+from telegram import Update
+
+from .metrics import (UPDATE_STREAM_LAG, UPDATE_STREAM_PENDING, UPDATE_STREAM_PROCESSED,
+                      UPDATE_STREAM_RECLAIMED)
+from .models import Bot
+from .redis_client import get_async_redis
+from .scheduler import lane_scheduler
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = "kuku_ai_bot:updates:{bot_id}"
+CONSUMER_GROUP = "kuku_ai_bot"
+
+# Consumer group'i borligi tasdiqlangan botlar (har bir update uchun Redis'ga qayta so'ralmaydi)
+_known_groups: set[int] = set()
+
+
+def stream_key(bot_id: int) -> str:
+    return STREAM_KEY.format(bot_id=bot_id)
+
+
+async def publish(bot_instance: Bot, raw_update: bytes) -> None:
+    """Webhook'dan kelgan xom update JSON'ini botning stream'iga qo'shadi (XADD)."""
+    await get_async_redis().xadd(
+        stream_key(bot_instance.pk),
+        {"update": raw_update},
+        maxlen=settings.BOT_UPDATE_STREAM_MAXLEN,
+        approximate=True,
+    )
+
+
+async def has_consumer_group(bot_id: int) -> bool:
+    """
+    Bot stream'ida consumer group bormi — ya'ni `run_update_consumers` bu botni
+    hech bo'lmaganda bir marta ishga tushirganmi. Aks holda XADD qilingan
+    update'larni hech kim o'qimaydi.
+    """
+    if bot_id in _known_groups:
+        return True
+    try:
+        groups = await get_async_redis().xinfo_groups(stream_key(bot_id))
+    except redis.ResponseError:
+        # Stream hali yaratilmagan
+        return False
+    if any(group["name"] in (CONSUMER_GROUP, CONSUMER_GROUP.encode()) for group in groups):
+        _known_groups.add(bot_id)
+        return True
+    return False
+
+
+class StreamConsumer:
+    """
+    Bitta botning stream'ini consumer group orqali o'qiydigan worker.
+
+    Har bir xabar `Application.process_update` bilan qayta ishlanib XACK qilinadi.
+    Yiqilgan consumer'larda qolib ketgan (pending) xabarlar `claim_idle_ms`
+    dan keyin XAUTOCLAIM orqali qayta olinadi.
+    """
+
+    def __init__(self, bot_instance: Bot, index: int, count: int = 10, block_ms: int = 5000,
+                 claim_idle_ms: int = 60000):
+        self.bot_instance = bot_instance
+        self.key = stream_key(bot_instance.pk)
+        self.name = f"{socket.gethostname()}-{os.getpid()}-{index}"
+        self.count = count
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.client = get_async_redis()
+        self._next_reclaim = 0.0
+
+    async def ensure_group(self) -> None:
+        try:
+            await self.client.xgroup_create(self.key, CONSUMER_GROUP, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def run(self, application) -> None:
+        await self.ensure_group()
+        logger.info(f"Stream consumer {self.name} started for {self.key}")
+        while True:
+            try:
+                await self.reclaim(application)
+                response = await self.client.xreadgroup(
+                    CONSUMER_GROUP, self.name, {self.key: ">"}, count=self.count, block=self.block_ms
+                )
+                for _, messages in response or []:
+                    await self.handle(application, messages)
+                await self.report_lag()
+            except asyncio.CancelledError:
+                raise
+            except redis.RedisError as e:
+                logger.warning(f"Stream consumer {self.name} Redis error: {e}")
+                await asyncio.sleep(1)
+
+    async def reclaim(self, application) -> None:
+        """Uzoq vaqt ACK qilinmagan xabarlarni shu consumer'ga o'tkazib, qayta ishlaydi."""
+        if time.monotonic() < self._next_reclaim:
+            return
+        self._next_reclaim = time.monotonic() + self.claim_idle_ms / 2000
+        result = await self.client.xautoclaim(
+            self.key, CONSUMER_GROUP, self.name, min_idle_time=self.claim_idle_ms, count=self.count
+        )
+        messages = result[1] if result else []
+        if messages:
+            UPDATE_STREAM_RECLAIMED.labels(bot=self.bot_instance.username).inc(len(messages))
+            logger.info(f"Stream consumer {self.name} reclaimed {len(messages)} pending update(s)")
+            await self.handle(application, messages)
+
+    async def handle(self, application, messages) -> None:
+        for message_id, fields in messages:
+            if fields is None:
+                # XAUTOCLAIM stream'dan allaqachon o'chirilgan xabar uchun None qaytaradi
+                await self.client.xack(self.key, CONSUMER_GROUP, message_id)
+                continue
+            try:
+                update = Update.de_json(orjson.loads(fields[b"update"]), application.bot)
+                await lane_scheduler.run(application, update)
+            except Exception:
+                # Buzilgan xabar abadiy qayta olinmasligi uchun u ham ACK qilinadi
+                logger.exception(f"Stream consumer {self.name} failed to process {message_id}")
+            await self.client.xack(self.key, CONSUMER_GROUP, message_id)
+            UPDATE_STREAM_PROCESSED.labels(bot=self.bot_instance.username).inc()
+
+    async def report_lag(self) -> None:
+        for group in await self.client.xinfo_groups(self.key):
+            if group["name"] not in (CONSUMER_GROUP, CONSUMER_GROUP.encode()):
+                continue
+            UPDATE_STREAM_PENDING.labels(bot=self.bot_instance.username).set(group["pending"])
+            # "lag" (hali hech kimga berilmagan xabarlar) Redis 7+ da mavjud
+            if group.get("lag") is not None:
+                UPDATE_STREAM_LAG.labels(bot=self.bot_instance.username).set(group["lag"])
@@ -1,19 +1,44 @@
 # views.py
+import html
 import logging
-from asgiref.sync import sync_to_async
+import time
 from django.core.paginator import Paginator
-from elasticsearch_dsl.query import QueryString
-from telegram import Update
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
+from telegram import InlineQueryResultCachedDocument, Update
 from telegram.constants import ParseMode
 from telegram.ext import ContextTypes
 logger = logging.getLogger(__name__)
 from . import translation
-from .documents import TgFileDocument
-from .keyboard import (build_search_results_keyboard, default_keyboard,
+from .keyboard import (FILE_TYPE_ICONS, build_search_results_keyboard, default_keyboard,
                        language_list_keyboard, restart_keyboard)
-from .models import SearchQuery, TgFile, User
+from .metrics import INLINE_QUERY_TIME
+from .models import BotFileId, SearchQuery, TgFile, User
+from .search import HIGHLIGHT_POST, HIGHLIGHT_PRE, TRACK_TOTAL_HITS_LIMIT
+from .search_backends import PRIMARY_ERRORS, FailoverBackend, get_backend
+from .search_cache import inline_cache, normalize_query
+from .search_session import SearchSession
 from .utils import (channel_subscribe, get_user,
                     update_or_create_user)
+from .webhook_reply import claim as claim_webhook_reply
+
+
+async def reply_text(update: Update, text: str, reply_markup=None, parse_mode=None):
+    """
+    update.message.reply_text o'rniga ishlatiladi. BOT_WEBHOOK_REPLY yoqilgan bo'lsa,
+    birinchi javob alohida API so'rovi bilan emas, webhook HTTP javobida yuboriladi.
+    Faqat handler'ning oxirgi (yagona) javobi uchun ishlating — inline javob
+    handler tugagandan keyin yetib boradi.
+    """
+    params = {
+        "chat_id": update.effective_chat.id,
+        "text": text,
+        "reply_markup": reply_markup.to_dict() if reply_markup else None,
+        "parse_mode": parse_mode,
+    }
+    if claim_webhook_reply(update, "sendMessage", params):
+        return None
+    return await update.message.reply_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
 
 
 # --- Asosiy Foydalanuvchi Funksiyalari ---
@@ -26,7 +51,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE, user: User,
     if not user.selected_language:
         await ask_language(update, context)
     else:
-        await update.message.reply_text(
+        await reply_text(
+            update,
             translation.start_not_created[language].format(user.full_name),
             reply_markup=default_keyboard(language, admin=user.is_admin)
         )
@@ -37,7 +63,8 @@ async def ask_language(update: Update, context: ContextTypes.DEFAULT_TYPE, user:
     """
     Tilni tanlash menyusini yuboradi.
     """
-    await update.message.reply_text(
+    await reply_text(
+        update,
         translation.ask_language_text[language],
         reply_markup=language_list_keyboard()
     )
@@ -77,7 +104,7 @@ async def toggle_search_mode(update: Update, context: ContextTypes.DEFAULT_TYPE,
 
     response_text = translation.deep_search_mode_on[language] if new_mode == 'deep' else \
         translation.normal_search_mode_on[language]
-    await update.message.reply_text(response_text)
+    await reply_text(update, response_text)
 
 
 @get_user
@@ -85,7 +112,7 @@ async def help_handler(update: Update, context: ContextTypes.DEFAULT_TYPE, user:
     """
     'Help' tugmasi uchun ishlaydi.
     """
-    await update.message.reply_text(translation.help_message[language])
+    await reply_text(update, translation.help_message[language])
 
 
 @get_user
@@ -93,7 +120,7 @@ async def about_handler(update: Update, context: ContextTypes.DEFAULT_TYPE, user
     """
     'About Us' tugmasi uchun ishlaydi.
     """
-    await update.message.reply_text(translation.about_message[language])
+    await reply_text(update, translation.about_message[language])
 
 
 @get_user
@@ -101,11 +128,28 @@ async def share_bot_handler(update: Update, context: ContextTypes.DEFAULT_TYPE,
     """
     'Share Bot' tugmasi uchun ishlaydi.
     """
-    await update.message.reply_text(translation.share_bot_text[language])
+    await reply_text(update, translation.share_bot_text[language])
 
 
 # --- Qidiruv va Fayllar Bilan Ishlash ---
 
+def search_results_text(result, query: str, language: str) -> str:
+    """
+    Natijalar xabari (HTML). Deep qidiruvda har bir hit ostida fayl ichidan
+    bitta qatorli parcha — foydalanuvchi keraksiz fayllarni ochib ko'rmaydi.
+    """
+    text = html.escape(translation.search_results_found[language].format(query=query, count=result.display_total))
+    lines = []
+    for hit in result.hits:
+        if not hit.snippet:
+            continue
+        snippet = html.escape(hit.snippet).replace(HIGHLIGHT_PRE, '<b>').replace(HIGHLIGHT_POST, '</b>')
+        lines.append(f"{FILE_TYPE_ICONS.get(hit.file_type, '📄')} {html.escape(hit.title)}\n<i>…{snippet}…</i>")
+    if lines:
+        text += "\n\n" + "\n\n".join(lines)
+    return text
+
+
 @channel_subscribe
 @get_user
 async def main_text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE, user: User, language: str):
@@ -115,96 +159,93 @@ async def main_text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE,
     """
     text = update.message.text.strip()
     search_mode = context.user_data.get('default_search_mode', 'normal')
-    page_number = 1
-    page_size = 10
-
-    search_fields = ['title^5', 'description^1', 'file_name^4']
-    if search_mode == 'deep':
-        search_fields.append('content^3')
-
-    s = TgFileDocument.search().query(
-        QueryString(query=f"*{text}*", fields=search_fields, default_operator='AND')
-    )
 
-    # Natijalar sonini olish
-    total_results = s.count()
+    # Qidiruv sessiyasi: natija topilguncha exact -> fuzzy -> deep tier'lari sinaladi,
+    # keyingi sahifalar shu natijalar "surati"dan olinadi
+    session, result = await SearchSession.create(text, search_mode)
 
-    if total_results == 0:
+    if result.total == 0:
         await SearchQuery.objects.acreate(
             user=user, query_text=text, found_results=False, is_deep_search=(search_mode == 'deep')
         )
-        await update.message.reply_text(translation.search_no_results[language].format(query=text))
+        await reply_text(update, translation.search_no_results[language].format(query=text))
         return
 
-    # Kerakli sahifani olish (slicing)
-    start_index = (page_number - 1) * page_size
-    end_index = start_index + page_size
-    search_results = s[start_index:end_index].execute()
-
-    all_files_ids = [int(hit.meta.id) for hit in search_results]
-
     await SearchQuery.objects.acreate(
-        user=user, query_text=text, found_results=True, is_deep_search=(search_mode == 'deep')
+        user=user, query_text=text, found_results=True, is_deep_search=(search_mode == 'deep'), tier=session.tier
     )
 
-    context.user_data['last_search_query'] = text
-    # Django Paginator o'rniga to'g'ridan-to'g'ri ma'lumotlar bilan ishlash
-    # Sahifalash uchun maxsus Paginator-ga o'xshash obyekt yaratish mumkin yoki
-    # kerakli ma'lumotlarni (umumiy soni, joriy sahifa) to'g'ridan-to'g'ri uzatish
-    from django.core.paginator import Paginator, Page
-    paginator = Paginator(range(total_results), page_size)  # Dummy paginator for page range
-    page_obj = Page(all_files_ids, page_number, paginator)
+    # Sahifa ES _source'idan, relevance tartibida chiziladi (bazaga so'rovsiz)
+    response_text = search_results_text(result, text, language)
+    reply_markup = build_search_results_keyboard(result.as_page(), session, language)
+    await update.message.reply_text(response_text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
+    await replace_search_session(context, session)
 
-    files_on_page = await sync_to_async(list)(
-        TgFile.objects.filter(id__in=page_obj.object_list).order_by('-uploaded_at'))
 
-    response_text = translation.search_results_found[language].format(query=text, count=total_results)
-    reply_markup = build_search_results_keyboard(page_obj, files_on_page, search_mode, language)
-    await update.message.reply_text(response_text, reply_markup=reply_markup)
+async def replace_search_session(context: ContextTypes.DEFAULT_TYPE, session: SearchSession) -> None:
+    """Chat'ning joriy sessiyasi yangisiga almashtiriladi; oldingisining PIT'i yopiladi."""
+    previous = context.chat_data.get('search_session')
+    context.chat_data['search_session'] = session.session_id
+    if previous != session.session_id:
+        await SearchSession.release(previous)
 
 
 @get_user
 async def handle_search_pagination(update: Update, context: ContextTypes.DEFAULT_TYPE, user: User, language: str):
     """
-    Qidiruv natijalari sahifalarini o'zgartiradi (samarali usulda).
+    Qidiruv natijalari sahifalarini o'zgartiradi. Sahifa callback'dagi sessiya
+    ID'si bo'yicha saqlangan natijalardan olinadi (so'rov qayta bajarilmaydi).
     """
     query = update.callback_query
     await query.answer()
-    page_size = 10
 
-    query_text = context.user_data.get('last_search_query')
-    if not query_text:
-        await query.edit_message_text(translation.search_no_results[language].format(query=""))
+    _, session_id, page_number_str = query.data.split('_')
+    page_number = int(page_number_str)
+
+    session = await SearchSession.load(session_id)
+    if session is None:
+        await query.edit_message_text(translation.search_session_expired[language])
         return
 
-    _, search_mode, page_number_str = query.data.split('_')
-    page_number = int(page_number_str)
+    query_text = session.query
+    result = await session.page(page_number)
+    response_text = search_results_text(result, query_text, language)
+    reply_markup = build_search_results_keyboard(result.as_page(), session, language)
+    await query.edit_message_text(text=response_text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
 
-    search_fields = ['title^5', 'description^1', 'file_name^4']
-    if search_mode == 'deep':
-        search_fields.append('content^3')
 
-    s = TgFileDocument.search().query(
-        QueryString(query=f"*{query_text}*", fields=search_fields, default_operator='AND')
-    )
-    total_results = s.count()
+# Facet callback'idagi qisqa nom -> sessiya filtri
+FACET_KINDS = {'t': 'file_type', 's': 'subcategory'}
 
-    # Kerakli sahifani olish (slicing)
-    start_index = (page_number - 1) * page_size
-    end_index = start_index + page_size
-    search_results = s[start_index:end_index].execute()
-    all_files_ids = [int(hit.meta.id) for hit in search_results]
 
-    from django.core.paginator import Paginator, Page
-    paginator = Paginator(range(total_results), page_size)
-    page_obj = Page(all_files_ids, page_number, paginator)
+@get_user
+async def handle_search_facet(update: Update, context: ContextTypes.DEFAULT_TYPE, user: User, language: str):
+    """
+    Facet tugmasi: joriy sessiyaning so'rovi shu filtr bilan (yoki filtrsiz —
+    "x") qayta bajariladi va yangi sessiyaning birinchi sahifasi ko'rsatiladi.
+    """
+    query = update.callback_query
+    await query.answer()
 
-    files_on_page = await sync_to_async(list)(
-        TgFile.objects.filter(id__in=page_obj.object_list).order_by('-uploaded_at'))
+    _, session_id, kind, value = query.data.split('_', 3)
+    session = await SearchSession.load(session_id)
+    if session is None:
+        await query.edit_message_text(translation.search_session_expired[language])
+        return
 
-    response_text = translation.search_results_found[language].format(query=query_text, count=total_results)
-    reply_markup = build_search_results_keyboard(page_obj, files_on_page, search_mode, language)
-    await query.edit_message_text(text=response_text, reply_markup=reply_markup)
+    filters = {} if kind == 'x' else {**session.filters, FACET_KINDS[kind]: value}
+    session, result = await SearchSession.create(session.query, session.search_mode, filters=filters)
+    if result.total == 0:
+        await query.edit_message_text(translation.search_no_results[language].format(query=session.query))
+        return
+
+    response_text = search_results_text(result, session.query, language)
+    reply_markup = build_search_results_keyboard(result.as_page(), session, language)
+    await query.edit_message_text(text=response_text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
+    # Xabar yangi sessiyaga o'tdi: eski sessiyaning PIT'i (chat'ning joriysi bo'lmasa ham) yopiladi
+    if context.chat_data.get('search_session') != session_id:
+        await SearchSession.release(session_id)
+    await replace_search_session(context, session)
 
 
 from telegram.error import TelegramError
@@ -219,14 +260,21 @@ async def send_file_by_callback(update: Update, context: ContextTypes.DEFAULT_TY
     file_id = int(query.data.split('_')[1])
     await query.answer()
 
+    bot_instance = context.bot_data.get("bot_instance")
     try:
         tg_file = await TgFile.objects.aget(id=file_id)
-        await context.bot.send_document(
+        # Fayl shu bot orqali avval yuborilgan bo'lsa, qayta yuklamaymiz
+        cached_file_id = await BotFileId.objects.filter(
+            bot=bot_instance, tg_file=tg_file).values_list('file_id', flat=True).afirst()
+        message = await context.bot.send_document(
             chat_id=user.telegram_id,
-            document=tg_file.file.path,
+            document=cached_file_id or tg_file.file.path,
             caption=f"<b>{tg_file.title}</b>\n\n{tg_file.description or ''}",
             parse_mode=ParseMode.HTML
         )
+        if not cached_file_id and message.document:
+            await BotFileId.objects.aupdate_or_create(
+                bot=bot_instance, tg_file=tg_file, defaults={'file_id': message.document.file_id})
     except TgFile.DoesNotExist:
         await context.bot.send_message(chat_id=user.telegram_id, text="Xatolik: Fayl topilmadi.")
     except TelegramError as e:
@@ -244,3 +292,93 @@ async def send_file_by_callback(update: Update, context: ContextTypes.DEFAULT_TY
         # Boshqa kutilmagan xatoliklar uchun
         logger.exception(f"Fayl yuborishda kutilmagan xatolik: {e}")
         await context.bot.send_message(chat_id=user.telegram_id, text="Faylni yuborishda noma'lum xatolik yuz berdi.")
+
+
+async def inline_search_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    `@bot so'rov` — inline rejimda search-as-you-type qidiruv. Faqat shu bot
+    orqali avval yuborilgan (file_id'si saqlangan) fayllar natija bo'ladi.
+    Foydalanuvchi bazadan so'ralmaydi: javob ~100ms ichida qaytishi kerak.
+    Search-as-you-type faqat Elasticsearch'da: u o'chiq, ishlamayapti yoki
+    circuit breaker ochiq bo'lsa — bo'sh javob.
+    """
+    inline_query = update.inline_query
+    bot_instance = context.bot_data.get("bot_instance")
+    text = inline_query.query.strip()
+    if not text or not bot_instance:
+        await inline_query.answer([], cache_time=settings.INLINE_CACHE_TIME)
+        return
+
+    try:
+        offset = int(inline_query.offset or 0)
+    except ValueError:
+        offset = 0
+    limit = settings.INLINE_RESULTS_LIMIT
+    # Offset mijozdan keladi: manfiy yoki Elasticsearch oynasidan (max_result_window) tashqari — natija yo'q
+    max_offset = TRACK_TOTAL_HITS_LIMIT - limit
+    if not 0 <= offset <= max_offset:
+        await inline_query.answer([], cache_time=settings.INLINE_CACHE_TIME)
+        return
+
+    backend = get_backend()
+    if not isinstance(backend, FailoverBackend) or backend.breaker.is_open:
+        # Telegram bo'sh javobni keshlamasin: Elasticsearch tiklangach natijalar darhol chiqishi kerak
+        await inline_query.answer([], cache_time=0)
+        return
+
+    with INLINE_QUERY_TIME.time():
+        key = (bot_instance.pk, normalize_query(text), offset)
+        cached = inline_cache.get(key)
+        if cached is None:
+            try:
+                cached = await inline_results(backend, bot_instance, text, offset, limit, max_offset)
+            except PRIMARY_ERRORS as e:
+                logger.warning(f"Inline search failed: {e}")
+                await inline_query.answer([], cache_time=0)
+                return
+            inline_cache.set(key, cached)
+
+    results, next_offset = cached
+    await inline_query.answer(results, cache_time=settings.INLINE_CACHE_TIME, next_offset=next_offset)
+
+
+async def inline_results(backend, bot_instance, text: str, offset: int, limit: int,
+                         max_offset: int) -> tuple[list, str]:
+    """
+    `offset` dan boshlab `limit` tagacha natija va `next_offset`. file_id'si yo'q
+    hit'lar tashlab yuboriladi, shuning uchun sahifa to'lguncha (yoki
+    `INLINE_FILL_BUDGET_MS` tugaguncha) keyingi hit'lar so'raladi — aks holda
+    bo'sh javob `next_offset` bilan qaytib, mijoz keyingi sahifani so'ramaydi.
+    """
+    deadline = time.monotonic() + settings.INLINE_FILL_BUDGET_MS / 1000
+    results = []
+    position = offset
+    exhausted = False
+    while len(results) < limit and position <= max_offset:
+        hits = await backend.suggest(text, position, limit)
+        file_ids = {
+            tg_file_id: file_id
+            async for tg_file_id, file_id in BotFileId.objects.filter(
+                bot=bot_instance, tg_file_id__in=[hit.id for hit in hits]
+            ).values_list('tg_file_id', 'file_id')
+        }
+        for hit in hits:
+            position += 1
+            if hit.id not in file_ids:
+                continue
+            results.append(InlineQueryResultCachedDocument(
+                id=str(hit.id),
+                title=hit.title,
+                document_file_id=file_ids[hit.id],
+                description=" · ".join(filter(None, [hit.subcategory, filesizeformat(hit.size_in_bytes)])),
+            ))
+            if len(results) == limit:
+                break
+        if len(hits) < limit:
+            exhausted = True
+            break
+        if time.monotonic() >= deadline:
+            break
+    # Keyingi sahifa — oxirgi ko'rilgan hit'dan keyin (ES oynasi tugasa — sahifa yo'q)
+    next_offset = "" if exhausted or position > max_offset else str(position)
+    return results, next_offset
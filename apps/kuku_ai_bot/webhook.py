@@ -1,47 +1,120 @@
 # webhook.py (Corrected)
-import json
 import logging
+import random
+
+import orjson
 
-from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.http import JsonResponse
-from django.shortcuts import get_object_or_404
+from django.http import Http404, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from telegram import Update
 
-from .handler import get_application
-from .models import Bot as BotModel
+from . import registry
+from .bootstrap import ensure_application
+from .dedup import DONE, PROCESSING, update_deduplicator
+from .scheduler import lane_scheduler
+from .update_queue import update_queue
+from .update_stream import has_consumer_group, publish as publish_to_stream
+from .webhook_reply import close_slot, open_slot
 
 
 logger = logging.getLogger(__name__)
 
 
+def log_update_sample(bot_instance, data: dict, size: int) -> None:
+    """Update'ning to'liq matnini emas, faqat tuzilmaviy xulosasini yozadi (hajmi BOT_UPDATE_LOG_SAMPLE_RATE bilan cheklangan)."""
+    kind = next((key for key in data if key != "update_id"), None)
+    logger.info(
+        "Webhook update sample bot=%s update_id=%s kind=%s size=%s",
+        bot_instance.username, data["update_id"], kind, size,
+    )
+
+
 @csrf_exempt
 async def bot_webhook(request, token):
     """
     Receives webhook requests from Telegram, validates them, and passes
-    the update to the application for processing either directly or via Celery.
+    the update to the application for processing either inline or via the
+    in-process update queue (settings.BOT_UPDATE_MODE).
     """
-    bot_instance = await sync_to_async(get_object_or_404)(BotModel, token=token)
+    # Bot ma'lumotlari worker xotirasidagi registrdan olinadi (DB so'rovisiz)
+    bot_instance = await registry.aget(token)
+    if bot_instance is None:
+        raise Http404("Bot not found")
 
     if request.method != "POST":
         return JsonResponse({"status": "invalid request"}, status=400)
 
     try:
-        data = json.loads(request.body.decode("utf-8"))
-        print(data)
-    except json.JSONDecodeError:
+        # orjson baytlarni to'g'ridan-to'g'ri o'qiydi (decode bosqichisiz)
+        data = orjson.loads(request.body)
+    except orjson.JSONDecodeError:
         logger.warning("Received invalid JSON in webhook")
         return JsonResponse({"status": "invalid json"}, status=400)
 
-    # Process the update directly in the main thread
-    application = get_application(bot_instance.token)
+    update_id = data.get("update_id") if isinstance(data, dict) else None
+    if not isinstance(update_id, int):
+        return JsonResponse({"status": "invalid update"}, status=400)
+
+    if settings.BOT_UPDATE_LOG_SAMPLE_RATE and random.random() < settings.BOT_UPDATE_LOG_SAMPLE_RATE:
+        log_update_sample(bot_instance, data, len(request.body))
+
+    if settings.BOT_UPDATE_DEDUP:
+        state = await update_deduplicator.begin(bot_instance.pk, update_id)
+        if state == DONE:
+            # Telegram retry'i: update allaqachon qabul qilingan
+            return JsonResponse({"status": "duplicate"})
+        if state == PROCESSING:
+            # Birinchi urinish hali ishlayapti: u muvaffaqiyatsiz bo'lsa keyingi retry o'tishi kerak
+            return JsonResponse({"status": "processing"}, status=409)
+
+    try:
+        response = await dispatch_update(bot_instance, data, request.body)
+    except BaseException:
+        # Update qabul qilinmadi (500 yoki so'rov bekor qilindi) — Telegram retry'i dublikat deb tashlanmasligi kerak
+        if settings.BOT_UPDATE_DEDUP:
+            await update_deduplicator.forget(bot_instance.pk, update_id)
+        raise
+    if settings.BOT_UPDATE_DEDUP:
+        if response.status_code >= 300:
+            await update_deduplicator.forget(bot_instance.pk, update_id)
+        else:
+            await update_deduplicator.finish(bot_instance.pk, update_id)
+    return response
+
+
+async def dispatch_update(bot_instance, data: dict, raw_update: bytes) -> JsonResponse:
+    """Update'ni BOT_UPDATE_MODE bo'yicha stream'ga, navbatga yoki to'g'ridan-to'g'ri qayta ishlashga beradi."""
+    if settings.BOT_UPDATE_MODE == "stream":
+        # Xom JSON Redis stream'ga yoziladi; qayta ishlash `run_update_consumers` da
+        if not await has_consumer_group(bot_instance.pk):
+            logger.error(f"No stream consumer group for bot {bot_instance.username}, "
+                         f"is run_update_consumers running?")
+            return JsonResponse({"status": "no consumer"}, status=503)
+        await publish_to_stream(bot_instance, raw_update)
+        return JsonResponse({"status": "queued"})
 
-    # Make the bot instance available to handlers/decorators
-    application.bot_data["bot_instance"] = bot_instance
+    # Application lifespan startup'da tayyorlangan; bu yerda faqat deserialize va dispatch
+    application = await ensure_application(bot_instance)
 
     update = Update.de_json(data, application.bot)
-    await application.initialize()
-    await application.process_update(update)
 
-    return JsonResponse({"status": "ok"})
\ No newline at end of file
+    if settings.BOT_UPDATE_MODE == "queue":
+        # Fast-ack: update navbatga qo'yiladi va javob darhol qaytariladi
+        if not update_queue.running:
+            update_queue.start()
+        if not update_queue.put(application, update):
+            return JsonResponse({"status": "overloaded"}, status=503)
+        return JsonResponse({"status": "queued"})
+
+    if not settings.BOT_WEBHOOK_REPLY:
+        await lane_scheduler.run(application, update)
+        return JsonResponse({"status": "ok"})
+
+    # Birinchi mos javob (views.reply_text) webhook javobining o'zida qaytariladi
+    open_slot(update)
+    try:
+        await lane_scheduler.run(application, update)
+    finally:
+        method_call = close_slot(update)
+    return JsonResponse(method_call or {"status": "ok"})
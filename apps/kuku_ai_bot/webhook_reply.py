@@ -0,0 +1,31 @@
+# webhook_reply.py
+
+from telegram import Update
+
+# Telegram webhook javobining body'sida bitta Bot API metodini qabul qiladi.
+# Shu update uchun ochilgan "slot"ga birinchi mos javob yoziladi va webhook uni
+# HTTP javobida qaytaradi — bu bitta alohida HTTPS so'rovni tejaydi.
+# Update'lar lane scheduler'ning boshqa task'ida qayta ishlangani uchun contextvar
+# emas, update obyekti bo'yicha lug'at ishlatiladi.
+_slots: dict[int, dict | None] = {}
+
+
+def open_slot(update: Update) -> None:
+    _slots[id(update)] = None
+
+
+def close_slot(update: Update) -> dict | None:
+    """Slotni yopadi va unga yozilgan metod chaqiruvini (bo'lsa) qaytaradi."""
+    return _slots.pop(id(update), None)
+
+
+def claim(update: Update, method: str, params: dict) -> bool:
+    """
+    Agar shu update uchun slot ochiq va bo'sh bo'lsa, metod chaqiruvini unga yozadi.
+    False qaytsa, javobni odatdagidek Bot API orqali yuborish kerak.
+    """
+    key = id(update)
+    if key not in _slots or _slots[key] is not None:
+        return False
+    _slots[key] = {"method": method, **{name: value for name, value in params.items() if value is not None}}
+    return True
@@ -1,37 +1,134 @@
 # apps/webapp/views.py
+import logging
+
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404
 from django.views.generic import ListView
 from apps.kuku_ai_bot.models import TgFile
 from django.conf import settings
 from apps.kuku_ai_bot.documents import TgFileDocument
-from elasticsearch_dsl.query import MultiMatch
+from apps.kuku_ai_bot.search import TRACK_TOTAL_HITS_LIMIT, facet_counts
+from apps.kuku_ai_bot.search_backends import PRIMARY_ERRORS, get_backend
 from django.views.generic import DetailView
 from elasticsearch_dsl.query import MoreLikeThis
+
+logger = logging.getLogger(__name__)
+
+
 class FileListView(ListView):
     model = TgFile
     template_name = 'file_list.html'
     context_object_name = 'files'
     paginate_by = 30 # Foydalanuvchi talabiga ko'ra 30 taga o'zgartirdik
+    # ?file_type=pdf&subcategory=3&category=1 — facet filtrlari
+    filter_params = ('file_type', 'subcategory', 'category')
+
+    def get_filters(self):
+        filters = {}
+        for name in self.filter_params:
+            value = self.request.GET.get(name)
+            if not value:
+                continue
+            valid = value in dict(TgFile.FILE_TYPE_CHOICES) if name == 'file_type' else value.isdigit()
+            if valid:
+                filters[name] = value
+        return filters
+
+    # Sayt qidiruvi fayl ichidan (content) ham qidiradi
+    search_mode = 'deep'
+
+    def get_search_query(self):
+        return self.request.GET.get('q') or None
 
     def get_queryset(self):
-        query = self.request.GET.get('q')
-        if query:
-            # Agar qidiruv so'rovi bo'lsa, Elasticsearch'dan qidiramiz
-            s = TgFileDocument.search().query(
-                MultiMatch(query=query, fields=['title^4', 'description^2', 'file_name', 'content'], fuzziness='AUTO')
-            )
-            # Faqat ID'larni olamiz
-            all_files_ids = [int(hit.meta.id) for hit in s.scan()]
-            # Bazadan shu ID'lar bo'yicha fayllarni olamiz
-            queryset = TgFile.objects.filter(id__in=all_files_ids)
-            return queryset
-        # Agar qidiruv so'rovi bo'lmasa, barcha fayllarni qaytaramiz
-        return TgFile.objects.all()
+        filters = self.get_filters()
+        if self.get_search_query() is not None:
+            # Qidiruvda sahifa Elasticsearch'dan olinadi (paginate_queryset)
+            return TgFile.objects.none()
+        # Agar qidiruv so'rovi bo'lmasa, barcha fayllarni (filtrlar bilan) qaytaramiz
+        queryset = TgFile.objects.all()
+        if 'file_type' in filters:
+            queryset = queryset.filter(file_type=filters['file_type'])
+        if 'subcategory' in filters:
+            queryset = queryset.filter(subcategory_id=filters['subcategory'])
+        if 'category' in filters:
+            queryset = queryset.filter(subcategory__category_id=filters['category'])
+        return queryset
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Qidiruvda faqat joriy sahifa so'raladi (bot bilan umumiy backend:
+        bitta so'rovda hit'lar, jami son va facet'lar, Redis keshi bilan).
+        Aniq moslik bo'lmasa — imlo xatolariga chidamli (fuzzy) tier.
+        Elasticsearch ishlamasa (yoki circuit breaker ochiq bo'lsa) — bazadagi qidiruv.
+        """
+        query = self.get_search_query()
+        if query is None:
+            return super().paginate_queryset(queryset, page_size)
+        page_number = self.request.GET.get(self.page_kwarg) or 1
+        try:
+            page_number = int(page_number)
+        except ValueError:
+            raise Http404("Invalid page")
+        # Elasticsearch from+size TRACK_TOTAL_HITS_LIMIT (max_result_window) dan oshmasligi kerak
+        max_results = TRACK_TOTAL_HITS_LIMIT // page_size * page_size
+        if page_number < 1 or page_number * page_size > max_results:
+            raise Http404("Invalid page")
+        filters = self.get_filters()
+        self.search_page = get_backend().page_sync(query, self.search_mode, page_number, page_size,
+                                                   tiers=('exact', 'fuzzy'), filters=filters, with_facets=True)
+        paginator = Paginator(range(min(self.search_page.total, max_results)), page_size)
+        try:
+            page = paginator.page(page_number)
+        except InvalidPage as e:
+            raise Http404(str(e))
+        # Hit'lar tartibida (score bo'yicha) bazadagi fayllar
+        files = TgFile.objects.in_bulk(self.search_page.ids)
+        page.object_list = [files[file_id] for file_id in self.search_page.ids if file_id in files]
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_facets(self, filters):
+        """Har bir facet qiymati uchun havola: joriy so'rov va boshqa filtrlar saqlanadi."""
+        search_page = getattr(self, 'search_page', None)
+        try:
+            if search_page is not None:
+                # Qidiruvda facet'lar sahifa so'rovining o'zidan keladi (bazadagi qidiruvda — yo'q)
+                facets = search_page.facets or {}
+            elif settings.SEARCH_BACKEND == 'database':
+                facets = {}
+            else:
+                facets = facet_counts(None, filters)
+        except PRIMARY_ERRORS as e:
+            # Facet'lar ixtiyoriy: Elasticsearch ishlamasa ro'yxat ularsiz ko'rsatiladi
+            logger.warning(f"Facet aggregation failed: {e}")
+            return {}
+        file_type_labels = dict(TgFile.FILE_TYPE_CHOICES)
+        links = {}
+        for name, items in facets.items():
+            links[name] = []
+            for item in items:
+                value = str(item['value'])
+                params = self.request.GET.copy()
+                params.pop('page', None)
+                active = filters.get(name) == value
+                if active:
+                    params.pop(name, None)
+                else:
+                    params[name] = value
+                label = file_type_labels.get(value, value) if name == 'file_type' else item['label']
+                links[name].append({'label': label, 'count': item['count'], 'active': active,
+                                    'url': f"?{params.urlencode()}"})
+        return links
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['bot_username'] = settings.TELEGRAM_BOT_USERNAME
         # Qidiruv so'rovini ham template'ga yuboramiz
         context['search_query'] = self.request.GET.get('q', '')
+        filters = self.get_filters()
+        context['facets'] = self.get_facets(filters)
+        # Sahifalash havolalarida filtrlarni saqlash uchun
+        context['filter_query'] = ''.join(f"&{name}={value}" for name, value in filters.items())
         return context
 
 class FileDetailView(DetailView):
@@ -52,8 +149,14 @@ class FileDetailView(DetailView):
             )
         )
         # Birinchi 10 ta o'xshash faylni olamiz
-        related_files_search = s[:10].execute()
-        related_files_ids = [int(hit.meta.id) for hit in related_files_search]
+        related_files_ids = []
+        if settings.SEARCH_BACKEND != 'database':
+            try:
+                related_files_search = s[:10].execute()
+                related_files_ids = [int(hit.meta.id) for hit in related_files_search]
+            except PRIMARY_ERRORS as e:
+                # O'xshash fayllar ixtiyoriy: Elasticsearch ishlamasa sahifa ularsiz ko'rsatiladi
+                logger.warning(f"Related files search failed: {e}")
 
         context['related_files'] = TgFile.objects.filter(id__in=related_files_ids)
         return context
\ No newline at end of file
@@ -1,7 +1,45 @@
+import logging
 import os
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings.production')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+logger = logging.getLogger(__name__)
+
+
+async def lifespan(scope, receive, send):
+    """
+    ASGI lifespan protokoli: botlarning Application'lari worker ishga tushganda
+    bir marta quriladi va to'xtaganda yopiladi.
+    """
+    from apps.kuku_ai_bot import bootstrap
+
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                await bootstrap.startup()
+            except Exception as e:
+                logger.exception("Lifespan startup failed")
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            try:
+                await bootstrap.shutdown()
+            except Exception as e:
+                logger.exception("Lifespan shutdown failed")
+                await send({"type": "lifespan.shutdown.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -203,8 +203,50 @@ logging.config.dictConfig({
 
 WEBHOOK_URL = env.str("WEBHOOK_URL", "https://bot.zamonsher.icu")
 APPEND_SLASH = False
+
+# Telegram update'larini qayta ishlash rejimi:
+#   inline — webhook update'ni o'zi qayta ishlab, keyin javob qaytaradi
+#   queue  — webhook update'ni in-process navbatga qo'yib darhol 200 qaytaradi
+#   stream — webhook update'ni Redis stream'ga yozadi, uni `run_update_consumers` qayta ishlaydi
+BOT_UPDATE_MODE = env.str("BOT_UPDATE_MODE", "inline")
+BOT_UPDATE_QUEUE_SIZE = env.int("BOT_UPDATE_QUEUE_SIZE", 1000)
+BOT_UPDATE_WORKERS = env.int("BOT_UPDATE_WORKERS", 8)
+# reject (503 qaytaradi) yoki drop_oldest
+BOT_UPDATE_QUEUE_OVERFLOW = env.str("BOT_UPDATE_QUEUE_OVERFLOW", "reject")
+BOT_UPDATE_STREAM_MAXLEN = env.int("BOT_UPDATE_STREAM_MAXLEN", 100000)
+# Telegram qayta yuborgan update'larni (bot_id, update_id) bo'yicha tashlab yuborish
+BOT_UPDATE_DEDUP = env.bool("BOT_UPDATE_DEDUP", True)
+BOT_UPDATE_DEDUP_TTL = env.int("BOT_UPDATE_DEDUP_TTL", 24 * 60 * 60)
+BOT_UPDATE_DEDUP_LRU_SIZE = env.int("BOT_UPDATE_DEDUP_LRU_SIZE", 10000)
+# Birinchi urinish hali ishlayotgan ("processing") belgi muddati — worker yiqilsa retry shundan keyin o'tadi
+BOT_UPDATE_DEDUP_PROCESSING_TTL = env.int("BOT_UPDATE_DEDUP_PROCESSING_TTL", 60)
+# inline rejimida oddiy javoblarni (help, about, ...) webhook HTTP javobida qaytarish
+BOT_WEBHOOK_REPLY = env.bool("BOT_WEBHOOK_REPLY", False)
+# Webhook update'larining qancha qismi log qilinadi (0 — hech biri)
+BOT_UPDATE_LOG_SAMPLE_RATE = env.float("BOT_UPDATE_LOG_SAMPLE_RATE", 0.01)
+# Bir jarayonda bir vaqtda qayta ishlanadigan update'lar soni (turli chat'lar bo'yicha)
+BOT_UPDATE_CONCURRENCY = env.int("BOT_UPDATE_CONCURRENCY", 32)
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 TELEGRAM_BOT_USERNAME = os.getenv('TELEGRAM_BOT_USERNAME', 'kuku_student_bot')
+# Bot API manzili (lokal Bot API server yoki load test uchun soxta API ko'rsatilishi mumkin)
+TELEGRAM_BOT_API_URL = env.str("TELEGRAM_BOT_API_URL", "https://api.telegram.org/bot")
+
+# Barcha botlar uchun umumiy Bot API HTTP havzasi (web va Celery worker'larida).
+# Bu — jarayondagi BARCHA botlar uchun bir vaqtdagi oddiy so'rovlar chegarasi
+# (PTB'ning o'zida har bir bot uchun alohida 256 ta edi); band bo'lsa so'rov
+# TELEGRAM_HTTP_POOL_TIMEOUT kutib PoolTimeout bilan tugaydi.
+TELEGRAM_HTTP_POOL_SIZE = env.int("TELEGRAM_HTTP_POOL_SIZE", 64)
+# Fayl yuklashlar (send_document va h.k.) alohida havzada: bir vaqtda shuncha yuklash
+TELEGRAM_HTTP_UPLOAD_POOL_SIZE = env.int("TELEGRAM_HTTP_UPLOAD_POOL_SIZE", 32)
+TELEGRAM_HTTP_UPLOAD_POOL_TIMEOUT = env.float("TELEGRAM_HTTP_UPLOAD_POOL_TIMEOUT", 30.0)
+TELEGRAM_HTTP_KEEPALIVE_EXPIRY = env.float("TELEGRAM_HTTP_KEEPALIVE_EXPIRY", 60.0)
+# "1.1" yoki "2" (HTTP/2 uchun `h2` paketi kerak: pip install "python-telegram-bot[http2]")
+TELEGRAM_HTTP_VERSION = env.str("TELEGRAM_HTTP_VERSION", "1.1")
+TELEGRAM_HTTP_CONNECT_TIMEOUT = env.float("TELEGRAM_HTTP_CONNECT_TIMEOUT", 5.0)
+TELEGRAM_HTTP_READ_TIMEOUT = env.float("TELEGRAM_HTTP_READ_TIMEOUT", 10.0)
+TELEGRAM_HTTP_WRITE_TIMEOUT = env.float("TELEGRAM_HTTP_WRITE_TIMEOUT", 10.0)
+TELEGRAM_HTTP_POOL_TIMEOUT = env.float("TELEGRAM_HTTP_POOL_TIMEOUT", 3.0)
+TELEGRAM_HTTP_MEDIA_WRITE_TIMEOUT = env.float("TELEGRAM_HTTP_MEDIA_WRITE_TIMEOUT", 60.0)
 
 # Elasticsearch
 ES_URL = os.getenv('ES_URL', 'http://elasticsearch:9200')
@@ -215,6 +257,45 @@ ELASTICSEARCH_DSL = {
         'hosts': 'http://localhost:9200'
     },
 }
+# Bot handler'laridagi AsyncElasticsearch klienti uchun
+ES_REQUEST_TIMEOUT = env.float("ES_REQUEST_TIMEOUT", 5.0)
+ES_MAX_RETRIES = env.int("ES_MAX_RETRIES", 2)
+ES_CONNECTIONS_PER_NODE = env.int("ES_CONNECTIONS_PER_NODE", 20)
+# Qidiruv sahifalari keshi (Redis); TgFile o'zgarganda avtomatik eskiradi
+SEARCH_CACHE_ENABLED = env.bool("SEARCH_CACHE_ENABLED", True)
+SEARCH_CACHE_TTL = env.int("SEARCH_CACHE_TTL", 300)
+# Bot qidiruv sessiyalari (sahifalash): shu songacha ID ro'yxati saqlanadi, ko'p bo'lsa PIT ochiladi
+SEARCH_SESSION_MAX_IDS = env.int("SEARCH_SESSION_MAX_IDS", 500)
+SEARCH_SESSION_TTL = env.int("SEARCH_SESSION_TTL", 30 * 60)
+SEARCH_SESSION_PIT_KEEP_ALIVE = env.str("SEARCH_SESSION_PIT_KEEP_ALIVE", "10m")
+# Natija topilmasa fuzzy/deep tier'lariga o'tish uchun umumiy vaqt (ms)
+SEARCH_FALLBACK_BUDGET_MS = env.int("SEARCH_FALLBACK_BUDGET_MS", 400)
+# Deep qidiruv natijalaridagi fayl ichidan olingan parcha uzunligi (belgi)
+SEARCH_SNIPPET_SIZE = env.int("SEARCH_SNIPPET_SIZE", 100)
+# Qidiruv backend'i: "elasticsearch" (bazadagi full-text zaxirasi bilan) yoki "database" (ES'siz)
+SEARCH_BACKEND = env.str("SEARCH_BACKEND", "elasticsearch")
+# ES ketma-ket shuncha marta xato bersa (yoki javob LATENCY_MS dan sekin bo'lsa) qidiruv
+# bazaga o'tadi; RESET_SECONDS dan keyin ES bitta so'rov bilan qayta sinab ko'riladi
+SEARCH_BREAKER_FAILURES = env.int("SEARCH_BREAKER_FAILURES", 5)
+SEARCH_BREAKER_LATENCY_MS = env.int("SEARCH_BREAKER_LATENCY_MS", 1500)
+SEARCH_BREAKER_RESET_SECONDS = env.float("SEARCH_BREAKER_RESET_SECONDS", 30.0)
+# TgFile saqlanganda indekslash sinxron emas: ID navbatga tushadi, Celery worker
+# partiyalab matn ajratadi va bitta bulk so'rovi yuboradi (search_indexing.py)
+ELASTICSEARCH_DSL_AUTOSYNC = False
+SEARCH_INDEX_BATCH_SIZE = env.int("SEARCH_INDEX_BATCH_SIZE", 200)
+# Saqlashdan keyin task shuncha soniya kutadi — shu orada kelgan o'zgarishlar bitta partiyaga tushadi
+SEARCH_INDEX_DELAY = env.int("SEARCH_INDEX_DELAY", 5)
+SEARCH_INDEX_RETRY_DELAY = env.int("SEARCH_INDEX_RETRY_DELAY", 60)
+# Shuncha urinishdan keyin indekslanmagan fayl navbatdan chetga olinadi (admin'dagi "chetga olingan")
+SEARCH_INDEX_MAX_ATTEMPTS = env.int("SEARCH_INDEX_MAX_ATTEMPTS", 10)
+# Inline rejim (@bot so'rov): natijalar soni (Telegram max 50), Telegram tomonidagi
+# kesh vaqti va jarayon ichidagi "issiq" so'rovlar keshi
+INLINE_RESULTS_LIMIT = env.int("INLINE_RESULTS_LIMIT", 50)
+INLINE_CACHE_TIME = env.int("INLINE_CACHE_TIME", 300)
+# file_id'si yo'q hit'lar tashlanganda sahifani to'ldirish uchun keyingi hit'larni so'rash vaqti
+INLINE_FILL_BUDGET_MS = env.int("INLINE_FILL_BUDGET_MS", 200)
+INLINE_HOT_CACHE_SIZE = env.int("INLINE_HOT_CACHE_SIZE", 1000)
+INLINE_HOT_CACHE_TTL = env.float("INLINE_HOT_CACHE_TTL", 30.0)
 
 # Prometheus
 PROMETHEUS_METRICS_ENABLED = os.getenv('PROMETHEUS_METRICS_ENABLED', 'true').lower() == 'true'